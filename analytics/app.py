@@ -66,12 +66,25 @@ app.layout = html.Div([
 ], className="dashboard-container")
 
 
+# Last analytics payload and its ETag, reused when the backend answers 304
+_analytics_cache = {"etag": None, "data": None}
+
+
 def fetch_analytics_data():
-    """Fetch analytics data from backend API"""
+    """Fetch analytics data from backend API (conditional GET)"""
+    headers = {}
+    if _analytics_cache["etag"]:
+        headers["If-None-Match"] = _analytics_cache["etag"]
+
     try:
-        response = requests.get(f"{API_BASE_URL}/api/analytics/metrics", timeout=5)
+        response = requests.get(f"{API_BASE_URL}/api/analytics/metrics", headers=headers, timeout=5)
+        if response.status_code == 304:
+            return _analytics_cache["data"]
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        _analytics_cache["etag"] = response.headers.get("ETag")
+        _analytics_cache["data"] = data
+        return data
     except Exception as e:
         print(f"Error fetching analytics: {e}")
         return None
@@ -18,12 +18,20 @@ app.title = "HR Ticket Analytics"
 # API endpoint
 API_URL = "http://localhost:8000/api/analytics/metrics"
 
+# Last payload and its ETag, reused when the backend answers 304
+_cache = {"etag": None, "data": None}
+
 def fetch_data():
-    """Fetch analytics data from backend"""
+    """Fetch analytics data from backend (conditional GET)"""
+    headers = {"If-None-Match": _cache["etag"]} if _cache["etag"] else {}
     try:
-        response = requests.get(API_URL, timeout=5)
-        if response.status_code == 200:
-            return response.json()
+        response = requests.get(API_URL, headers=headers, timeout=5)
+        if response.status_code == 304:
+            return _cache["data"]
+        elif response.status_code == 200:
+            _cache["etag"] = response.headers.get("ETag")
+            _cache["data"] = response.json()
+            return _cache["data"]
         else:
             return get_mock_data()
     except Exception as e:
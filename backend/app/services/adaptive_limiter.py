@@ -0,0 +1,145 @@
+"""
+Adaptive concurrency limiter
+AIMD limit on in-flight upstream calls; excess calls are shed or wait for a slot
+"""
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit
+
+    Each healthy completion (no overload, latency at or under target)
+    raises the limit by 1/limit, so roughly +1 per limit's worth of calls,
+    but only while at least half the limit is in use; light traffic says
+    nothing about what the upstream can take.
+
+    An overload signal (429, timeout) halves it, at most once per round:
+    calls that started before the last decrease don't shrink it again, so
+    one burst of failures is one decrease. Slow but successful calls hold
+    the limit steady.
+
+    Interactive callers use try_acquire and are shed when the limit is
+    reached; batch work awaits acquire and queues for the next free slot.
+    """
+
+    def __init__(
+        self,
+        min_limit: int = 1,
+        max_limit: int = 8,
+        initial_limit: int = None,
+        latency_target: float = 5.0,
+        decrease_factor: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            min_limit: Floor for the limit
+            max_limit: Ceiling for the limit (the inference pool size)
+            initial_limit: Starting limit (default: half of max_limit)
+            latency_target: Seconds a call may take and still count as healthy
+            decrease_factor: Multiplier applied to the limit on overload
+            clock: Monotonic time source (injectable for testing)
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self._clock = clock
+        self._limit = float(initial_limit or max(min_limit, max_limit // 2))
+        self._in_flight = 0
+        self._last_decrease = clock()
+        self._lock = threading.Lock()
+        # (loop, future) per coroutine waiting in acquire(), oldest first
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.shed = 0
+        self.decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def try_acquire(self) -> bool:
+        """Claim a slot if one is free; False means shed this call"""
+        with self._lock:
+            if self._in_flight >= int(self._limit):
+                self.shed += 1
+                return False
+            self._in_flight += 1
+            return True
+
+    async def acquire(self):
+        """Wait until a slot is free and claim it"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._in_flight < int(self._limit):
+                    self._in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+                    else:
+                        # Already woken: pass on the slot this waiter will not use
+                        self._wake_waiters()
+                raise
+
+    def release(self, started_at: float, latency: float, overloaded: bool = False, healthy: bool = True):
+        """
+        Return a slot and adapt the limit
+
+        Args:
+            started_at: clock() value when the call was admitted
+            latency: Seconds the call took
+            overloaded: The upstream signalled overload (429 or timeout)
+            healthy: The call succeeded; False with overloaded=False
+                (e.g. a malformed response) leaves the limit unchanged
+        """
+        with self._lock:
+            in_use = self._in_flight
+            self._in_flight -= 1
+            if overloaded:
+                if started_at >= self._last_decrease:
+                    self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+                    self._last_decrease = self._clock()
+                    self.decreases += 1
+            elif healthy and latency <= self.latency_target and in_use * 2 >= self._limit:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._wake_waiters()
+
+    def _wake_waiters(self):
+        """Wake as many acquire() waiters as there are free slots (lock held)"""
+        free = int(self._limit) - self._in_flight
+        while free > 0 and self._waiters:
+            loop, waiter = self._waiters.pop(0)
+            loop.call_soon_threadsafe(_wake, waiter)
+            free -= 1
+
+    def now(self) -> float:
+        return self._clock()
+
+    def stats(self) -> Dict:
+        """Limit and counters for health output"""
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "latency_target_seconds": self.latency_target,
+            "shed": self.shed,
+            "decreases": self.decreases,
+        }
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
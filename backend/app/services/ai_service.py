@@ -3,13 +3,126 @@ AI Service for ticket classification and auto-resolution
 Uses HuggingFace Inference API for classification
 """
 import os
+import re
 import json
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional
-from huggingface_hub import InferenceClient
+
+import httpx
+
+from app.services.adaptive_limiter import AdaptiveLimiter
+from app.services.cache import LRUCache
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.json_stream import JsonObjectScanner
+from app.services.knowledge_base import KnowledgeBase
+from app.services.local_classifier import LOCAL_CLASSIFIER_PATH, LocalClassifier
+from app.services.metrics import METRICS, STAGE_LATENCY
+from app.services.phrase_matcher import fold_inflections, fold_plural, tokenize
+from app.services.singleflight import SingleFlight
+from app.services.text_analyzer import TextAnalysis, TextAnalyzer
 
 # Configure HuggingFace
 HUGGINGFACE_TOKEN = os.getenv("HUGGINGFACE_TOKEN", "")
 
+HF_MODEL = os.getenv("HF_MODEL", "microsoft/Phi-3-mini-4k-instruct")
+
+# Inference endpoint (point at a local stub server for testing)
+HF_INFERENCE_URL = os.getenv("HF_INFERENCE_URL", "https://api-inference.huggingface.co/models")
+HF_CONNECT_TIMEOUT = float(os.getenv("HF_CONNECT_TIMEOUT", "3"))
+HF_READ_TIMEOUT = float(os.getenv("HF_READ_TIMEOUT", "20"))
+
+# Circuit breaker: consecutive failures (or slow calls) before calls are
+# skipped, and seconds before a probe call is tried again
+HF_BREAKER_FAILURES = int(os.getenv("HF_BREAKER_FAILURES", "5"))
+HF_BREAKER_SLOW_SECONDS = float(os.getenv("HF_BREAKER_SLOW_SECONDS", "10"))
+HF_BREAKER_RESET_SECONDS = float(os.getenv("HF_BREAKER_RESET_SECONDS", "30"))
+
+# Classifier backend: auto (HuggingFace if a token is set, else the local
+# model if trained, else keywords), huggingface, local or keyword
+CLASSIFIER_MODE = os.getenv("CLASSIFIER_MODE", "auto")
+
+# Classification cache for repeated questions
+CLASSIFICATION_CACHE_SIZE = int(os.getenv("CLASSIFICATION_CACHE_SIZE", "4096"))
+CLASSIFICATION_CACHE_TTL = float(os.getenv("CLASSIFICATION_CACHE_TTL", "3600"))
+
+# Cheap classifiers answer on their own at or above this confidence;
+# below it the ticket goes to HuggingFace (set above 100 to always call it)
+CASCADE_CONFIDENCE_THRESHOLD = float(os.getenv("CASCADE_CONFIDENCE_THRESHOLD", "85"))
+
+# Phrases that force human escalation, one per line
+SENSITIVE_LEXICON_PATH = os.getenv("SENSITIVE_LEXICON_PATH", "app/lexicons/sensitive_terms.txt")
+
+# Max seconds a coalesced request waits on an identical in-flight call
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "30"))
+
+# Max concurrent blocking inference calls per worker process
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+
+# Adaptive (AIMD) limit on in-flight HuggingFace calls, between the min and
+# AI_MAX_CONCURRENCY; it grows while calls finish within the latency target
+AI_MIN_CONCURRENCY = int(os.getenv("AI_MIN_CONCURRENCY", "1"))
+AI_LATENCY_TARGET_SECONDS = float(os.getenv("AI_LATENCY_TARGET_SECONDS", "5"))
+
+# Knowledge base sections cited per auto-resolution, and the similarity
+# the best one needs before a ticket is auto-resolved at all: from the
+# category's own document, or (much higher) from any other document
+KB_RESOLUTION_TOP_K = int(os.getenv("KB_RESOLUTION_TOP_K", "3"))
+KB_RESOLUTION_MIN_SCORE = float(os.getenv("KB_RESOLUTION_MIN_SCORE", "0.25"))
+KB_RESOLUTION_OTHER_DOC_SCORE = float(os.getenv("KB_RESOLUTION_OTHER_DOC_SCORE", "0.4"))
+KB_CATEGORY_BOOST = 1.25
+
+# A best section shorter than this is answered together with the matching
+# sections next to it under the same heading
+KB_RESOLUTION_CONTEXT_CHARS = 200
+
+# Resolution confidence runs from 85 (the auto-resolve bar) at the
+# acceptance score up to 99 at this score
+KB_RESOLUTION_FULL_SCORE = 0.6
+
+# Bytes of knowledge base document text kept in memory; the rest is read
+# from disk when a section is quoted
+KB_CACHE_BYTES = int(os.getenv("KB_CACHE_BYTES", str(8 * 1024 * 1024)))
+
+# Numbered list items in a section become the resolution's steps
+NUMBERED_STEP = re.compile(r"^\s*\d+\.\s+(.+?)\s*$", re.MULTILINE)
+
+# Inference metrics
+HF_REQUESTS = METRICS.counter("hr_hf_requests_total", "HuggingFace classification calls")
+HF_FAILURES = METRICS.counter("hr_hf_failures_total", "Failed HuggingFace classification calls")
+AI_FALLBACKS = METRICS.counter(
+    "hr_ai_fallbacks_total", "HuggingFace classifications that fell back to an offline classifier"
+)
+CASCADE_TIER_RESULTS = METRICS.counter(
+    "hr_cascade_tier_total", "Cascade tier attempts by tier and outcome (accepted, passed or failed)"
+)
+CLASSIFICATION_CACHE_LOOKUPS = METRICS.counter(
+    "hr_classification_cache_lookups_total", "Classification cache lookups by result"
+)
+COALESCED_CLASSIFICATIONS = METRICS.counter(
+    "hr_classification_coalesced_total",
+    "Classifications that shared an identical in-flight call, by outcome",
+)
+AI_CONCURRENCY_LIMIT = METRICS.gauge(
+    "hr_ai_concurrency_limit", "Current adaptive limit on in-flight HuggingFace calls"
+)
+HF_STREAM_TOKENS = METRICS.histogram(
+    "hr_hf_stream_tokens",
+    "Tokens read per streamed HuggingFace classification before the JSON closed",
+    buckets=(10, 20, 40, 60, 80, 100, 150, 200),
+)
+HF_CIRCUIT_STATE = METRICS.gauge(
+    "hr_hf_circuit_open", "1 if the HuggingFace circuit breaker is open or half-open"
+)
+
+# Failure reasons that say the endpoint is unhealthy (not just a bad completion)
+UPSTREAM_FAILURES = {"timeout", "rate_limited", "http_error", "request_error"}
+
+# Failure reasons that mean "send less traffic"
+OVERLOAD_FAILURES = {"timeout", "rate_limited"}
+
 class AIService:
     """AI-powered ticket classification and resolution"""
     
@@ -32,82 +145,496 @@ class AIService:
         "General HR Inquiries",
     ]
     
-    # Keywords that trigger immediate escalation
+    # Keywords that trigger immediate escalation (used if the lexicon file is missing)
     SENSITIVE_KEYWORDS = [
         'harassment', 'discrimination', 'lawsuit', 'lawyer', 'sue',
         'unsafe', 'assault', 'threat', 'suicide', 'violence'
     ]
     
-    def __init__(self, knowledge_base_path: str = None):
+    # Keyword fallback classifier: category -> keywords (whole-word matches)
+    KEYWORD_MAP = {
+        "Benefits Enrollment": ["401k", "health insurance", "benefits", "enrollment", "open enrollment"],
+        "PTO/Leave Requests": ["pto", "vacation", "sick leave", "time off", "leave"],
+        "Payroll Issues": ["paycheck", "salary", "overtime", "pay", "direct deposit", "withholding"],
+        "IT Access Requests": ["access", "password", "vpn", "salesforce", "permissions"],
+        "Policy Clarifications": ["policy", "wfh", "work from home", "remote work", "dress code"],
+        "Performance Reviews": ["performance", "review", "goals", "feedback"],
+        "Onboarding Status": ["onboarding", "new hire", "orientation", "start date"],
+        "Equipment Requests": ["laptop", "monitor", "equipment", "headset", "keyboard"],
+        "Tax/W2 Documents": ["w-2", "w2", "tax", "withholding", "1099"],
+        "401k/Retirement": ["401k", "retirement", "investment", "vesting"],
+        "Health Insurance": ["health insurance", "medical", "deductible", "claim", "ppo", "hmo"],
+        "Expense Reimbursement": ["expense", "reimbursement", "receipt", "per diem"],
+        "Role/Title Changes": ["promotion", "title", "role change"],
+        "Workspace/Facilities": ["conference room", "parking", "facilities", "ac", "desk"],
+        "General HR Inquiries": ["workday", "address", "emergency contact", "hr"],
+    }
+    
+    # Words that raise keyword-classified urgency
+    URGENCY_KEYWORDS = {
+        "High": ["urgent", "asap", "emergency", "critical"],
+        "Medium": ["soon", "need", "help"],
+    }
+    
+    # Urgency levels, lowest first
+    URGENCY_LEVELS = ["Low", "Medium", "High", "Critical"]
+    
+    # Knowledge base document that answers each category
+    KB_CATEGORY_FILES = {
+        "PTO/Leave Requests": "pto_policy.md",
+        "Benefits Enrollment": "benefits_guide.md",
+        "401k/Retirement": "benefits_guide.md",
+        "Health Insurance": "benefits_guide.md",
+        "Policy Clarifications": "wfh_policy.md",
+        "General HR Inquiries": "workday_howto.md",
+        "Tax/W2 Documents": "workday_howto.md",
+        "Expense Reimbursement": "expense_policy.md",
+    }
+    
+    def __init__(self, knowledge_base_path: str = None, max_concurrency: int = None):
         """Initialize AI service with knowledge base"""
         self.knowledge_base_path = knowledge_base_path or "app/knowledge_base"
         self.knowledge_base = self._load_knowledge_base()
+        self._kb_reload_lock = threading.Lock()
+        
+        self._build_analyzer()
+        
+        # Bounded pool for blocking inference calls made from async code
+        self.max_concurrency = max_concurrency or AI_MAX_CONCURRENCY
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="ai-inference",
+        )
+        
+        # Cache of classifications keyed on normalized description
+        self.model = HF_MODEL
+        self.classification_cache = LRUCache(
+            maxsize=CLASSIFICATION_CACHE_SIZE,
+            ttl=CLASSIFICATION_CACHE_TTL,
+        )
+        self._cache_fingerprint = None
+        
+        # Coalesces identical concurrent AI classifications
+        self.single_flight = SingleFlight(timeout=SINGLE_FLIGHT_TIMEOUT)
+        
+        # Sheds HuggingFace calls beyond what the endpoint currently sustains
+        self.limiter = AdaptiveLimiter(
+            min_limit=min(AI_MIN_CONCURRENCY, self.max_concurrency),
+            max_limit=self.max_concurrency,
+            latency_target=AI_LATENCY_TARGET_SECONDS,
+        )
+        AI_CONCURRENCY_LIMIT.set(self.limiter.limit)
+        
+        # Skips HuggingFace while it is failing
+        self.circuit_breaker = CircuitBreaker(
+            "HuggingFace",
+            failure_threshold=HF_BREAKER_FAILURES,
+            slow_call_seconds=HF_BREAKER_SLOW_SECONDS,
+            reset_timeout=HF_BREAKER_RESET_SECONDS,
+            on_state_change=self._log_circuit_change,
+        )
         
         # Configure HuggingFace Inference API (if token available)
-        if HUGGINGFACE_TOKEN:
-            try:
-                # Initialize HuggingFace client
-                self.client = InferenceClient(token=HUGGINGFACE_TOKEN)
+        self.http = None
+        self.use_ai = False
+        if CLASSIFIER_MODE in ("auto", "huggingface"):
+            if HUGGINGFACE_TOKEN:
+                # Pooled keep-alive session, one connection per inference worker.
+                # HTTP/2 matters here: _generate_json closes each stream as soon
+                # as the JSON is complete, which on HTTP/2 resets just that
+                # stream; on HTTP/1.1 it drops the connection, and the next call
+                # pays for a new TCP/TLS handshake
+                self.http = httpx.Client(
+                    base_url=HF_INFERENCE_URL,
+                    http2=True,
+                    headers={"Authorization": f"Bearer {HUGGINGFACE_TOKEN}"},
+                    timeout=httpx.Timeout(HF_READ_TIMEOUT, connect=HF_CONNECT_TIMEOUT),
+                    limits=httpx.Limits(
+                        max_connections=self.max_concurrency,
+                        max_keepalive_connections=self.max_concurrency,
+                    ),
+                )
                 self.use_ai = True
-                print("✓ HuggingFace AI enabled with Phi-3 model")
-            except Exception as e:
-                print(f"Failed to initialize HuggingFace: {e}")
-                self.use_ai = False
-        else:
-            self.use_ai = False
-            print("No HuggingFace token, using mock responses")
-    
-    
-    def _load_knowledge_base(self) -> Dict[str, str]:
-        """Load knowledge base documents"""
-        kb = {}
-        kb_files = [
-            "pto_policy.md",
-            "benefits_guide.md",
-            "workday_howto.md",
-            "wfh_policy.md",
-            "expense_policy.md",
-        ]
-        
-        for filename in kb_files:
-            try:
-                filepath = os.path.join(self.knowledge_base_path, filename)
-                with open(filepath, 'r') as f:
-                    kb[filename] = f.read()
-            except FileNotFoundError:
-                print(f"Warning: {filename} not found")
+                print(f"✓ HuggingFace AI enabled with {self.model}")
+            else:
+                print("No HuggingFace token, using mock responses")
+        
+        # Local CPU classifier: first cascade tier, and the backend when HuggingFace is off
+        self.local_classifier = None
+        if CLASSIFIER_MODE in ("auto", "huggingface", "local"):
+            self.local_classifier = self._load_local_classifier()
+        self.cascade_threshold = CASCADE_CONFIDENCE_THRESHOLD
         
+        if self.use_ai:
+            self.classifier_mode = "huggingface"
+        elif self.local_classifier:
+            self.classifier_mode = "local"
+        else:
+            self.classifier_mode = "keyword"
+    
+    
+    def _load_knowledge_base(self) -> KnowledgeBase:
+        """Discover knowledge base documents, record their sections and index them"""
+        kb = KnowledgeBase(self.knowledge_base_path, cache_bytes=KB_CACHE_BYTES)
+        print(f"✓ Knowledge base: {len(kb)} documents, {len(kb.sections)} sections")
         return kb
     
-    def classify_ticket(self, description: str) -> Dict:
+    def reload_knowledge_base(self) -> Dict:
+        """
+        Pick up knowledge base edits without a restart
+        
+        Only added, removed and edited files are re-chunked and recounted;
+        requests keep using the current snapshot until the new one replaces
+        it in a single assignment.
+        
+        Returns:
+            Dict with the changed document names and timing
+        """
+        start = time.perf_counter()
+        with self._kb_reload_lock:
+            previous = self.knowledge_base
+            kb = previous.refresh()
+            if kb is not None:
+                self.knowledge_base = kb
+                kb.discard_replaced(previous)
+                print(f"✓ Knowledge base reloaded: {len(kb.changed)} changed, {len(kb)} documents")
+        return {
+            "changed": sorted(kb.changed) if kb is not None else [],
+            "documents": len(self.knowledge_base),
+            "seconds": round(time.perf_counter() - start, 4),
+        }
+    
+    def _load_local_classifier(self) -> Optional[LocalClassifier]:
+        """Load the trained local classifier, if one has been saved"""
+        try:
+            model = LocalClassifier.load(LOCAL_CLASSIFIER_PATH)
+        except FileNotFoundError:
+            print(f"No local classifier at {LOCAL_CLASSIFIER_PATH}, using keyword matching")
+            return None
+        
+        unknown = set(model.categories) - set(self.CATEGORIES)
+        if unknown:
+            print(f"Warning: local classifier is stale (unknown categories: {sorted(unknown)}), retrain it")
+            return None
+        
+        print(f"✓ Local classifier loaded ({len(model.vocabulary)} features)")
+        return model
+    
+    def _load_sensitive_lexicon(self) -> List[str]:
+        """Load escalation phrases, one per line (# comments allowed)"""
+        try:
+            with open(SENSITIVE_LEXICON_PATH, 'r') as f:
+                phrases = [
+                    line.strip() for line in f
+                    if line.strip() and not line.lstrip().startswith('#')
+                ]
+            print(f"✓ Loaded {len(phrases)} sensitive phrases")
+            return phrases
+        except FileNotFoundError:
+            print(f"Warning: {SENSITIVE_LEXICON_PATH} not found, using built-in sensitive keywords")
+            return list(self.SENSITIVE_KEYWORDS)
+    
+    def classify_ticket(self, description: str, analysis: Optional[TextAnalysis] = None) -> Dict:
         """
         Classify ticket into category with confidence score
         
         Args:
             description: Ticket description text
+            analysis: Shared scan of description, if the caller already has one
             
         Returns:
             Dict with category, confidence, urgency, reasoning
         """
-        # Check for sensitive content first
-        description_lower = description.lower()
-        if any(keyword in description_lower for keyword in self.SENSITIVE_KEYWORDS):
+        start = time.perf_counter()
+        if analysis is None:
+            analysis = self.analyzer.analyze(description)
+        result = (
+            self._classify_fast(description, analysis)
+            or self._classify_and_cache(description, analysis)
+        )
+        self._record_classification(start, result)
+        return result
+    
+    async def classify_ticket_async(
+        self, description: str, analysis: Optional[TextAnalysis] = None, wait_for_slot: bool = False
+    ) -> Dict:
+        """
+        Async version of classify_ticket that never blocks the event loop
+        
+        The HuggingFace call runs on a bounded thread pool, so concurrent
+        submissions overlap their inference waits up to max_concurrency.
+        The cheap cascade tiers and cache hits are CPU-cheap and run inline.
+        Identical descriptions classified concurrently share one upstream
+        call; a waiter that outlives SINGLE_FLIGHT_TIMEOUT falls back to
+        the offline classifier instead of blocking on a stuck call.
+        
+        With wait_for_slot, a call over the adaptive concurrency limit
+        waits for a free slot instead of being shed (for batch imports).
+        """
+        if not self.use_ai:
+            return self.classify_ticket(description, analysis)
+        
+        start = time.perf_counter()
+        if analysis is None:
+            analysis = self.analyzer.analyze(description)
+        result = self._classify_fast(description, analysis)
+        if result is None:
+            accepted, offline = self._classify_cheap(analysis)
+            if accepted is not None:
+                result = self._cache_result(description, accepted)
+            else:
+                result = await self._classify_with_ai_async(description, analysis, offline, wait_for_slot)
+        self._record_classification(start, result)
+        return result
+    
+    async def _classify_with_ai_async(
+        self, description: str, analysis: TextAnalysis, offline: Dict, wait_for_slot: bool = False
+    ) -> Dict:
+        """Coalesced HuggingFace call on the inference pool"""
+        if self.circuit_breaker.rejecting():
+            # Don't queue behind the pool just to be rejected
+            return self._circuit_open(offline)
+        
+        loop = asyncio.get_running_loop()
+        
+        async def call_upstream():
+            # Claim a slot before the pool, so excess load is shed instead of queued
+            if wait_for_slot:
+                await self.limiter.acquire()
+            elif not self.limiter.try_acquire():
+                return self._shed(offline)
+            admitted = self.limiter.now()
+            result = None
+            try:
+                result = await loop.run_in_executor(
+                    self._executor, self._classify_ai_and_cache, description, analysis, offline
+                )
+            finally:
+                self._release_limiter(admitted, result)
+            return result
+        
+        try:
+            result, shared = await self.single_flight.do(self._cache_key(description), call_upstream)
+        except asyncio.TimeoutError:
+            COALESCED_CLASSIFICATIONS.inc(outcome="timeout")
+            AI_FALLBACKS.inc(reason="coalesce_timeout")
+            return dict(offline, fallback_reason="coalesce_timeout")
+        if shared:
+            COALESCED_CLASSIFICATIONS.inc(outcome="shared")
+            result = dict(result, coalesced=True)
+        return result
+    
+    def _record_classification(self, start: float, result: Dict):
+        STAGE_LATENCY.observe(
+            time.perf_counter() - start,
+            stage="classify",
+            classifier="cache" if result.get("cached") else result.get("classifier", "unknown"),
+            fallback_reason=result.get("fallback_reason", ""),
+        )
+    
+    def _classify_fast(self, description: str, analysis: TextAnalysis) -> Optional[Dict]:
+        """Sensitive-content escalation or cached classification, if either applies"""
+        # Check for sensitive content first (whole words)
+        sensitive_matches = sorted(analysis.hits("sensitive"))
+        if sensitive_matches:
             return {
                 "category": "General HR Inquiries",
                 "confidence": 0,
                 "urgency": "Critical",
-                "reasoning": "Flagged as sensitive content requiring immediate human review",
+                "reasoning": (
+                    "Flagged as sensitive content requiring immediate human review "
+                    f"(matched: {', '.join(sensitive_matches)})"
+                ),
                 "sensitive": True,
+                "sensitive_matches": sensitive_matches,
+                "classifier": "sensitive_filter",
             }
         
-        # Use AI if available, otherwise use keyword matching
-        if self.use_ai:
-            return self._classify_with_ai(description)
-        else:
-            return self._classify_with_keywords(description)
+        self._check_cache_fingerprint()
+        cached = self.classification_cache.get(self._cache_key(description))
+        CLASSIFICATION_CACHE_LOOKUPS.inc(result="hit" if cached else "miss")
+        if cached:
+            return dict(cached, cached=True)
+        return None
+    
+    def _classify_and_cache(self, description: str, analysis: TextAnalysis) -> Dict:
+        """Run the classifier cascade and cache its result"""
+        accepted, offline = self._classify_cheap(analysis)
+        if accepted is not None:
+            return self._cache_result(description, accepted)
+        if not self.use_ai:
+            return self._cache_result(description, offline)
+        
+        if not self.limiter.try_acquire():
+            return self._shed(offline)
+        admitted = self.limiter.now()
+        result = None
+        try:
+            result = self._classify_ai_and_cache(description, analysis, offline)
+        finally:
+            self._release_limiter(admitted, result)
+        return result
+    
+    def _classify_ai_and_cache(self, description: str, analysis: TextAnalysis, offline: Dict) -> Dict:
+        if not self.circuit_breaker.allow():
+            return self._circuit_open(offline)
+        with STAGE_LATENCY.time(stage="cascade_tier", tier="huggingface"):
+            result = self._classify_with_ai(description, analysis, offline)
+        CASCADE_TIER_RESULTS.inc(
+            tier="huggingface", outcome="failed" if "fallback_reason" in result else "accepted"
+        )
+        return self._cache_result(description, result)
+    
+    def _release_limiter(self, admitted: float, result: Optional[Dict]):
+        """Free the limiter slot, adapting the limit to how the call went"""
+        reason = "error" if result is None else result.get("fallback_reason")
+        self.limiter.release(
+            admitted,
+            self.limiter.now() - admitted,
+            overloaded=reason in OVERLOAD_FAILURES,
+            healthy=reason is None,
+        )
+        AI_CONCURRENCY_LIMIT.set(self.limiter.limit)
+    
+    def _shed(self, offline: Dict) -> Dict:
+        """Offline result for a call over the concurrency limit"""
+        AI_FALLBACKS.inc(reason="shed")
+        return dict(offline, fallback_reason="shed")
+    
+    def _circuit_open(self, offline: Dict) -> Dict:
+        """Offline result served without calling HuggingFace"""
+        AI_FALLBACKS.inc(reason="circuit_open")
+        return dict(offline, fallback_reason="circuit_open")
     
-    def _classify_with_ai(self, description: str) -> Dict:
-        """Classify using HuggingFace AI"""
+    def _log_circuit_change(self, old_state: str, new_state: str):
+        # Logged on transitions only, so an outage is a few lines, not one per ticket
+        HF_CIRCUIT_STATE.set(0 if new_state == "closed" else 1)
+        print(f"HuggingFace circuit {old_state} -> {new_state}")
+    
+    def _cache_result(self, description: str, result: Dict) -> Dict:
+        # Don't pin a degraded fallback for the whole TTL
+        if "fallback_reason" not in result:
+            self.classification_cache.set(self._cache_key(description), dict(result))
+        return result
+    
+    def _classify_cheap(self, analysis: TextAnalysis) -> Tuple[Optional[Dict], Dict]:
+        """
+        Run the offline cascade tiers (local model, then keywords)
+        
+        Returns:
+            (accepted, offline): accepted is the first tier result at or
+            above the cascade threshold, or None if the ticket should go
+            to HuggingFace. offline is the result to use if HuggingFace is
+            unavailable: the most confident tier's, keywords on a tie.
+            A keyword result that matched no keyword is only a default
+            category at the floor confidence, so any other tier beats it.
+        """
+        tiers = [("keyword", self._classify_with_keywords)]
+        if self.local_classifier:
+            tiers.insert(0, ("local", self._classify_with_local))
+        
+        offline = None
+        for tier, classify in tiers:
+            with STAGE_LATENCY.time(stage="cascade_tier", tier=tier):
+                result = classify(analysis)
+            guess = tier == "keyword" and not analysis.hits("keyword")
+            if offline is None or (not guess and result["confidence"] >= offline["confidence"]):
+                offline = result
+            if result["confidence"] >= self.cascade_threshold:
+                CASCADE_TIER_RESULTS.inc(tier=tier, outcome="accepted")
+                return result, offline
+            CASCADE_TIER_RESULTS.inc(tier=tier, outcome="passed")
+        return None, offline
+    
+    def cascade_stats(self) -> Dict:
+        """Per-tier attempts and hit rates for health output"""
+        tiers = {}
+        for tier in ("local", "keyword", "huggingface"):
+            accepted = CASCADE_TIER_RESULTS.value(tier=tier, outcome="accepted")
+            attempts = accepted + sum(
+                CASCADE_TIER_RESULTS.value(tier=tier, outcome=outcome)
+                for outcome in ("passed", "failed")
+            )
+            tiers[tier] = {
+                "attempts": int(attempts),
+                "accepted": int(accepted),
+                "hit_rate": round(accepted / attempts, 3) if attempts else 0.0,
+            }
+        return {"threshold": self.cascade_threshold, "tiers": tiers}
+    
+    @staticmethod
+    def _cache_key(description: str) -> str:
+        """Normalize case, whitespace and trailing punctuation"""
+        return " ".join(description.lower().split()).rstrip(" .!?")
+    
+    def _check_cache_fingerprint(self):
+        """Invalidate cached classifications when categories or classifier change"""
+        fingerprint = (
+            tuple(self.CATEGORIES), self.model, self.classifier_mode, self.cascade_threshold
+        )
+        if fingerprint != self._cache_fingerprint:
+            self.classification_cache.clear()
+            self._cache_fingerprint = fingerprint
+    
+    async def classify_batch_async(
+        self,
+        descriptions: List[str],
+        analyses: Optional[List[TextAnalysis]] = None,
+        return_exceptions: bool = False,
+    ) -> List:
+        """
+        Classify a batch of tickets
+        
+        The offline tiers run inline. Tickets that need HuggingFace are
+        awaited together but queue for the adaptive limiter's slots, so at
+        most its current limit are in flight and none is shed.
+        
+        Args:
+            descriptions: Ticket description texts
+            analyses: Shared scans of descriptions, in the same order
+            return_exceptions: Put a ticket's exception in its slot instead
+                of raising it (as asyncio.gather does)
+        
+        Returns:
+            Classifications in the same order as descriptions
+        """
+        if analyses is None:
+            analyses = [self.analyzer.analyze(description) for description in descriptions]
+        
+        if not self.use_ai:
+            results = []
+            for description, analysis in zip(descriptions, analyses):
+                try:
+                    results.append(self.classify_ticket(description, analysis))
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    results.append(e)
+            return results
+        
+        return list(await asyncio.gather(
+            *(
+                self.classify_ticket_async(description, analysis, wait_for_slot=True)
+                for description, analysis in zip(descriptions, analyses)
+            ),
+            return_exceptions=return_exceptions,
+        ))
+    
+    def close(self):
+        """Release the inference thread pool and HTTP connections"""
+        self._executor.shutdown(wait=False)
+        if self.http is not None:
+            self.http.close()
+    
+    def _classify_with_ai(self, description: str, analysis: TextAnalysis, offline: Dict) -> Dict:
+        """
+        Classify using HuggingFace AI
+        
+        Args:
+            description: Ticket description text
+            analysis: Shared scan of description
+            offline: Offline classifier result returned if the call fails
+        """
         prompt = f"""You are an HR ticket classification system. Classify the following employee inquiry into ONE of these categories:
 
 {', '.join(self.CATEGORIES)}
@@ -122,62 +649,137 @@ Respond with JSON only:
   "reasoning": "brief explanation"
 }}"""
         
+        HF_REQUESTS.inc()
+        started = time.perf_counter()
         try:
-            print(f"🤖 Calling HuggingFace AI for classification...")
-            # Use Microsoft Phi-3 (smaller, faster, works well for classification)
-            response = self.client.text_generation(
-                prompt,
-                model="microsoft/Phi-3-mini-4k-instruct",
-                max_new_tokens=200,
-                temperature=0.2,
-            )
-            
-            print(f"✓ Got response from HuggingFace: {response[:100]}...")
-            
-            # Extract JSON from response
-            response_text = response.strip()
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0]
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0]
-            
-            result = json.loads(response_text.strip())
-            print(f"✓ AI Classification: {result['category']} ({result['confidence']}%)")
-            return result
+            result = self._parse_classification(self._generate_json(prompt))
         except Exception as e:
-            print(f"❌ AI classification failed: {e}")
-            print(f"Falling back to keyword matching...")
-            return self._classify_with_keywords(description)
-    
-    def _classify_with_keywords(self, description: str) -> Dict:
-        """Fallback keyword-based classification"""
-        description_lower = description.lower()
-        
-        # Simple keyword matching
-        keyword_map = {
-            "Benefits Enrollment": ["401k", "health insurance", "benefits", "enrollment", "open enrollment"],
-            "PTO/Leave Requests": ["pto", "vacation", "sick leave", "time off", "leave"],
-            "Payroll Issues": ["paycheck", "salary", "overtime", "pay", "direct deposit", "withholding"],
-            "IT Access Requests": ["access", "password", "vpn", "salesforce", "permissions"],
-            "Policy Clarifications": ["policy", "wfh", "work from home", "remote work", "dress code"],
-            "Performance Reviews": ["performance", "review", "goals", "feedback"],
-            "Onboarding Status": ["onboarding", "new hire", "orientation", "start date"],
-            "Equipment Requests": ["laptop", "monitor", "equipment", "headset", "keyboard"],
-            "Tax/W2 Documents": ["w-2", "w2", "tax", "withholding", "1099"],
-            "401k/Retirement": ["401k", "retirement", "investment", "vesting"],
-            "Health Insurance": ["health insurance", "medical", "deductible", "claim", "ppo", "hmo"],
-            "Expense Reimbursement": ["expense", "reimbursement", "receipt", "per diem"],
-            "Role/Title Changes": ["promotion", "title", "role change"],
-            "Workspace/Facilities": ["conference room", "parking", "facilities", "ac", "desk"],
-            "General HR Inquiries": ["workday", "address", "emergency contact", "hr"],
+            return self._ai_failure(e, offline, time.perf_counter() - started)
+        
+        self.circuit_breaker.record_success(time.perf_counter() - started)
+        result["classifier"] = "huggingface"
+        return result
+    
+    def _generate_json(self, prompt: str) -> str:
+        """
+        Stream a completion and stop as soon as its JSON object closes
+        
+        Returns:
+            Text of the first top-level JSON object in the output
+        
+        Raises:
+            ValueError: the output is not a JSON object (fails on the first
+                tokens of prose rather than after 200 of them)
+        """
+        scanner = JsonObjectScanner()
+        tokens = 0
+        with self.http.stream(
+            "POST",
+            f"/{self.model}",
+            json={
+                "inputs": prompt,
+                "parameters": {
+                    "max_new_tokens": 200,
+                    "temperature": 0.2,
+                    "return_full_text": False,
+                },
+                "stream": True,
+            },
+        ) as response:
+            response.raise_for_status()
+            # Server-sent events, one generated token per "data:" line
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[5:])
+                if "error" in event:
+                    raise RuntimeError(f"inference stream error: {event['error']}")
+                token = event["token"]
+                if token.get("special"):
+                    continue
+                tokens += 1
+                found = scanner.feed(token["text"])
+                if found is not None:
+                    # Leaving the block closes the stream, cancelling generation.
+                    # Draining it instead would keep an HTTP/1.1 connection
+                    # alive but wait out the rest of generation, far longer
+                    # than a reconnect
+                    HF_STREAM_TOKENS.observe(tokens)
+                    return found
+        raise ValueError("model output ended before the JSON object closed")
+    
+    def _parse_classification(self, text: str) -> Dict:
+        """
+        Validate a model's JSON classification
+        
+        Raises:
+            ValueError: unknown category or urgency, or confidence not 0-100
+        """
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError("classification is not a JSON object")
+        
+        categories = {category.lower(): category for category in self.CATEGORIES}
+        category = categories.get(str(data.get("category", "")).strip().lower())
+        if category is None:
+            raise ValueError(f"unknown category {data.get('category')!r}")
+        
+        urgencies = {level.lower(): level for level in self.URGENCY_LEVELS}
+        urgency = urgencies.get(str(data.get("urgency", "")).strip().lower())
+        if urgency is None:
+            raise ValueError(f"unknown urgency {data.get('urgency')!r}")
+        
+        confidence = data.get("confidence")
+        if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 <= confidence <= 100:
+            raise ValueError(f"confidence out of range: {confidence!r}")
+        
+        return {
+            "category": category,
+            "confidence": confidence,
+            "urgency": urgency,
+            "reasoning": str(data.get("reasoning", "")),
         }
+    
+    def _ai_failure(self, error: Exception, offline: Dict, elapsed: float) -> Dict:
+        """Count a failed AI call and serve the offline result"""
+        reason = self._fallback_reason(error)
+        if reason in UPSTREAM_FAILURES:
+            self.circuit_breaker.record_failure()
+        else:
+            # The endpoint answered; a bad completion is not an outage
+            self.circuit_breaker.record_success(elapsed)
+        HF_FAILURES.inc(reason=reason)
+        AI_FALLBACKS.inc(reason=reason)
+        return dict(offline, fallback_reason=reason)
+    
+    @staticmethod
+    def _fallback_reason(error: Exception) -> str:
+        """Low-cardinality label for why an AI call failed"""
+        if isinstance(error, httpx.HTTPStatusError):
+            return "rate_limited" if error.response.status_code == 429 else "http_error"
+        if isinstance(error, (ValueError, KeyError, IndexError, TypeError)):
+            # json.JSONDecodeError is a ValueError
+            return "invalid_response"
+        if isinstance(error, TimeoutError) or "timeout" in type(error).__name__.lower():
+            return "timeout"
+        return "request_error"
+    
+    def _classify_with_keywords(self, analysis: TextAnalysis) -> Dict:
+        """Fallback keyword-based classification from the shared text scan"""
+        matched = analysis.hits("keyword")
+        
+        # Score categories by distinct matched keywords
+        scores = {}
+        for phrase in matched:
+            for category in self._keyword_categories[phrase]:
+                scores[category] = scores.get(category, 0) + 1
         
-        # Find best match
+        # Find best match (first category in map order wins ties)
         best_category = "General HR Inquiries"
         best_score = 0
         
-        for category, keywords in keyword_map.items():
-            score = sum(1 for kw in keywords if kw in description_lower)
+        for category in self.KEYWORD_MAP:
+            score = scores.get(category, 0)
             if score > best_score:
                 best_score = score
                 best_category = category
@@ -185,106 +787,135 @@ Respond with JSON only:
         # Determine confidence and urgency
         confidence = min(50 + (best_score * 20), 95)
         
-        urgency = "Low"
-        if any(word in description_lower for word in ["urgent", "asap", "emergency", "critical"]):
-            urgency = "High"
-        elif any(word in description_lower for word in ["soon", "need", "help"]):
-            urgency = "Medium"
-        
         return {
             "category": best_category,
             "confidence": confidence,
-            "urgency": urgency,
-            "reasoning": f"Matched keywords: {', '.join([kw for kw in keyword_map[best_category] if kw in description_lower])}",
+            "urgency": self._keyword_urgency(analysis),
+            "reasoning": f"Matched keywords: {', '.join([kw for kw in self.KEYWORD_MAP[best_category] if kw in matched])}",
+            "sensitive": False,
+            "classifier": "keyword",
+        }
+    
+    def _keyword_urgency(self, analysis: TextAnalysis, floor: str = "Low") -> str:
+        """Highest of floor and the urgency implied by urgency words"""
+        levels = [floor] + [self._urgency_levels[word] for word in analysis.hits("urgency")]
+        return max(levels, key=self.URGENCY_LEVELS.index)
+    
+    def _classify_with_local(self, analysis: TextAnalysis) -> Dict:
+        """Classify with the local TF-IDF model (sub-millisecond, no network)"""
+        prediction = self.local_classifier.predict(analysis.text, analysis.words)
+        return {
+            "category": prediction["category"],
+            "confidence": prediction["confidence"],
+            # Explicit urgency words still raise the model's urgency
+            "urgency": self._keyword_urgency(analysis, prediction["urgency"]),
+            "reasoning": f"Local model; top terms: {', '.join(prediction['top_terms'])}",
             "sensitive": False,
+            "classifier": "local",
+        }
+    
+    def _build_analyzer(self):
+        """Compile the sensitive, keyword and urgency lexicons into one analyzer"""
+        self._keyword_categories: Dict[str, List[str]] = {}
+        for category, keywords in self.KEYWORD_MAP.items():
+            for keyword in keywords:
+                self._keyword_categories.setdefault(keyword, []).append(category)
+        
+        self._urgency_levels: Dict[str, str] = {
+            word: level
+            for level, words in self.URGENCY_KEYWORDS.items()
+            for word in words
         }
+        self.analyzer = TextAnalyzer(lexicons={
+            "sensitive": self._load_sensitive_lexicon(),
+            "keyword": list(self._keyword_categories),
+            "urgency": list(self._urgency_levels),
+        }, folding={
+            # "receipts" and "paychecks" are still expense and payroll words
+            "keyword": fold_plural,
+            "urgency": fold_plural,
+            # Any form of a sensitive word escalates ("threatens", "lawyers")
+            "sensitive": fold_inflections,
+        })
     
-    def auto_resolve(self, description: str, category: str) -> Optional[Dict]:
+    def auto_resolve(
+        self, description: str, category: str, analysis: Optional[TextAnalysis] = None
+    ) -> Optional[Dict]:
         """
         Attempt to auto-resolve ticket using RAG
         
         Args:
             description: Ticket description
             category: Classified category
+            analysis: Shared scan of description, if the caller already has one
             
         Returns:
             Dict with resolution, sources, confidence or None if can't resolve
         """
-        # Map categories to knowledge base files
-        kb_mapping = {
-            "PTO/Leave Requests": "pto_policy.md",
-            "Benefits Enrollment": "benefits_guide.md",
-            "401k/Retirement": "benefits_guide.md",
-            "Health Insurance": "benefits_guide.md",
-            "Policy Clarifications": "wfh_policy.md",
-            "General HR Inquiries": "workday_howto.md",
-            "Tax/W2 Documents": "workday_howto.md",
-            "Expense Reimbursement": "expense_policy.md",
-        }
-        
-        kb_file = kb_mapping.get(category)
-        if not kb_file or kb_file not in self.knowledge_base:
-            return None
-        
-        # Simple keyword-based extraction (in production, use embeddings + semantic search)
-        kb_content = self.knowledge_base[kb_file]
-        
-        # Mock resolution for common queries
-        return self._generate_mock_resolution(description, category, kb_file)
+        with STAGE_LATENCY.time(stage="auto_resolve"):
+            return self._auto_resolve(description, category, analysis)
     
-    def _generate_mock_resolution(self, description: str, category: str, source: str) -> Dict:
-        """Generate mock resolution with citation"""
-        description_lower = description.lower()
-        
-        # Common resolutions
-        if "401k" in description_lower and "match" in description_lower:
-            return {
-                "resolution": "Our company offers a 50% match on the first 6% of your salary contributed to the 401(k).\n\nExample: If you earn $100,000 and contribute 6% ($6,000), the company adds $3,000.\n\nAll contributions are immediately 100% vested.",
-                "sources": [{"file": source, "section": "401(k) Plan"}],
-                "confidence": 96,
-                "steps": None,
-            }
+    @staticmethod
+    def _resolution_confidence(score: float, bar: float) -> int:
+        """85 at the acceptance bar, rising to 99 at KB_RESOLUTION_FULL_SCORE"""
+        # A bar configured at or above the full score leaves no range to scale over
+        span = KB_RESOLUTION_FULL_SCORE - bar
+        if span <= 0:
+            return 99
+        return 85 + round(14 * min(1.0, max(0.0, (score - bar) / span)))
+    
+    def _auto_resolve(self, description: str, category: str, analysis: Optional[TextAnalysis]) -> Optional[Dict]:
+        kb = self.knowledge_base
+        kb_file = self.KB_CATEGORY_FILES.get(category)
+        if not kb_file or kb_file not in kb:
+            return None
         
-        if "pto" in description_lower or "request" in description_lower:
-            return {
-                "resolution": "To request PTO:\n\n1. Log in to Workday\n2. Navigate to Time Off > Request Time Off\n3. Select date range and PTO type (vacation or sick)\n4. Submit request\n\nVacation requests require 2 weeks advance notice. Your manager will approve within 3 business days.",
-                "sources": [{"file": source, "section": "Request Process"}],
-                "confidence": 98,
-                "steps": [
-                    "Log in to Workday",
-                    "Navigate to Time Off > Request Time Off",
-                    "Select dates and type",
-                    "Submit for manager approval"
-                ],
-            }
+        # Search every section, favouring the category's own document
+        words = analysis.words if analysis is not None else tokenize(description)
+        matches = kb.resolution_index.search(
+            words,
+            k=KB_RESOLUTION_TOP_K,
+            file_boost={kb_file: KB_CATEGORY_BOOST},
+        )
+        if not matches:
+            return None
         
-        if "open enrollment" in description_lower:
-            return {
-                "resolution": "Open Enrollment runs annually from November 1-15.\n\nDuring this period, you can:\n- Change medical, dental, vision plans\n- Update beneficiaries\n- Adjust FSA contributions\n\nChanges become effective January 1. Visit Workday > Benefits > Benefits Enrollment to make changes.",
-                "sources": [{"file": source, "section": "Open Enrollment"}],
-                "confidence": 99,
-                "steps": None,
-            }
+        # Only answer from a section that is about the question, and from
+        # another category's document only on a much stronger match
+        best, score = matches[0]
+        bar = KB_RESOLUTION_MIN_SCORE if best.file == kb_file else KB_RESOLUTION_OTHER_DOC_SCORE
+        if score < bar or not kb.resolution_index.on_topic(best, words):
+            return None
         
-        if "address" in description_lower and "workday" in description_lower:
-            return {
-                "resolution": "To update your address in Workday:\n\n1. Navigate to Personal Information\n2. Click the Contact tab\n3. Find 'Home Address' section\n4. Click Edit (pencil icon)\n5. Enter new address\n6. Click Submit\n\nHR will approve within 1 business day. This affects tax withholding and benefits, so update before year-end.",
-                "sources": [{"file": source, "section": "Updating Personal Information"}],
-                "confidence": 94,
-                "steps": [
-                    "Navigate to Personal Information",
-                    "Click Contact tab",
-                    "Edit Home Address",
-                    "Submit for approval"
-                ],
-            }
+        answer = [best]
+        if len(best.text) < KB_RESOLUTION_CONTEXT_CHARS:
+            # e.g. "Roth 401(k) Option" alone does not state the match
+            parent = best.path.rsplit(" > ", 1)[0]
+            answer += [
+                section for section, section_score in matches[1:]
+                if section.file == best.file
+                and section.path.rsplit(" > ", 1)[0] == parent
+                and section_score >= KB_RESOLUTION_MIN_SCORE
+            ]
+            answer.sort(key=lambda section: section.start)
         
-        # Generic response
+        texts = [section.text for section in answer]
+        if not all(texts):
+            # The file changed on disk after this snapshot was taken
+            return None
+        if len(answer) == 1:
+            text = texts[0]
+        else:
+            text = "\n\n".join(f"{section.heading}\n{section_text}" for section, section_text in zip(answer, texts))
+        steps = [match.group(1) for match in NUMBERED_STEP.finditer(text)]
         return {
-            "resolution": f"Based on our {source.replace('.md', '').replace('_', ' ').title()}, please refer to the relevant section for detailed information.",
-            "sources": [{"file": source, "section": "Overview"}],
-            "confidence": 75,
-            "steps": None,
+            "resolution": text.replace("**", ""),
+            "sources": [
+                {"file": section.file, "section": section.heading, "path": section.path, "score": round(section_score, 3)}
+                for section, section_score in matches
+            ],
+            "confidence": self._resolution_confidence(score, bar),
+            "steps": [step.replace("**", "") for step in steps] or None,
         }
 
 
@@ -0,0 +1,110 @@
+"""
+In-memory caching utilities
+Bounded LRU cache with per-entry TTL and hit/miss accounting
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe LRU cache whose entries also expire after a TTL"""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        clock: Callable[[], float] = time.monotonic,
+        maxbytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = len,
+    ):
+        """
+        Args:
+            maxsize: Max entries before the least recently used is evicted
+            ttl: Seconds an entry stays valid after being stored
+            clock: Monotonic time source (injectable for testing)
+            maxbytes: Also evict once the entries' total size exceeds this
+                (the most recent entry is always kept)
+            sizeof: Size of a value in bytes, used with maxbytes
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self._sizeof = sizeof
+        self._clock = clock
+        # key -> (expires_at, value, size), least recently used first
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value, size = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._bytes -= size
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store value, evicting the least recently used entry if full"""
+        size = self._sizeof(value) if self.maxbytes is not None else 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (self._clock() + self.ttl, value, size)
+            self._bytes += size
+            while len(self._entries) > self.maxsize or (
+                self.maxbytes is not None and self._bytes > self.maxbytes and len(self._entries) > 1
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        """Drop one entry, if present"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        """Size and hit/miss counters for health output"""
+        lookups = self.hits + self.misses
+        stats = {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+        if self.maxbytes is not None:
+            stats["bytes"] = self._bytes
+            stats["maxbytes"] = self.maxbytes
+        return stats
@@ -0,0 +1,133 @@
+"""
+Circuit breaker for upstream calls
+Stops calling a failing dependency and probes it again after a cool-down
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed: calls go through; failure_threshold consecutive failures (or
+        calls slower than slow_call_seconds) open the circuit
+    open: calls are rejected until reset_timeout has passed
+    half_open: one probe call is let through; success closes the
+        circuit, failure opens it again
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        slow_call_seconds: float = 10.0,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        on_state_change: Optional[Callable[[str, str], None]] = None,
+    ):
+        """
+        Args:
+            name: Dependency name used in log lines
+            failure_threshold: Consecutive failures that open the circuit
+            slow_call_seconds: Successful calls slower than this count as failures
+            reset_timeout: Seconds the circuit stays open before a probe
+            clock: Monotonic time source (injectable for testing)
+            on_state_change: Called with (old_state, new_state) on transitions
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._on_state_change = on_state_change
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def rejecting(self) -> bool:
+        """
+        True (and counted as a rejection) if the circuit is open and no
+        probe is due yet; a cheap pre-check that never claims the probe slot
+        """
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at < self.reset_timeout:
+                self.rejected += 1
+                return True
+            return False
+
+    def allow(self) -> bool:
+        """
+        Whether a call may proceed now
+
+        Every allowed call must be followed by record_success or
+        record_failure, or a half-open circuit never admits another probe.
+        """
+        with self._lock:
+            if self._state == OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self._transition(HALF_OPEN)
+
+            if self._state == HALF_OPEN:
+                if self._probe_in_flight:
+                    self.rejected += 1
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record_success(self, duration: float = 0.0):
+        """Report a completed call; slow calls count as failures"""
+        if duration > self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        """Report a failed call"""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                if self._state != OPEN:
+                    self.trips += 1
+                    self._transition(OPEN)
+
+    def _transition(self, state: str):
+        old_state, self._state = self._state, state
+        if self._on_state_change:
+            self._on_state_change(old_state, state)
+
+    def stats(self) -> Dict:
+        """State and counters for health output"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "slow_call_seconds": self.slow_call_seconds,
+            "reset_timeout_seconds": self.reset_timeout,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
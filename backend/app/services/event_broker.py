@@ -0,0 +1,102 @@
+"""
+Ticket event broker
+Fans ticket events out to Server-Sent Events subscribers without blocking producers
+"""
+import asyncio
+import itertools
+import json
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+
+class Subscription:
+    """One SSE client: a bounded event queue plus its filters"""
+
+    def __init__(self, max_queue: int, department: Optional[str] = None, status: Optional[str] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.department = department
+        self.status = status
+        self.coalesced = 0
+
+    def matches(self, event: Dict) -> bool:
+        if self.department and event.get("department") != self.department:
+            return False
+        # A status change also concerns clients watching the status it left
+        if self.status and self.status not in (event.get("status"), event.get("previous_status")):
+            return False
+        return True
+
+
+class EventBroker:
+    """Publishes ticket events to all matching subscribers"""
+
+    def __init__(self, max_queue: int = 100):
+        """
+        Args:
+            max_queue: Events buffered per subscriber before it is
+                considered slow and its backlog is coalesced
+        """
+        self.max_queue = max_queue
+        self._subscribers: Set[Subscription] = set()
+        self._sequence = itertools.count(1)
+
+    def subscribe(self, department: Optional[str] = None, status: Optional[str] = None) -> Subscription:
+        subscription = Subscription(self.max_queue, department=department, status=status)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, ticket: Dict, **extra) -> Dict:
+        """
+        Publish an event about a ticket; never blocks
+
+        Must be called from the event loop thread. A subscriber whose queue
+        is full has its backlog replaced by a single "resync" event telling
+        the client to refetch, so producers never wait on slow consumers.
+
+        Returns:
+            The published event
+        """
+        event = {
+            "id": next(self._sequence),
+            "type": event_type,
+            "ticket_id": ticket["id"],
+            "status": ticket["status"],
+            "department": ticket["department"],
+            "category": ticket["category"],
+            "urgency": ticket["urgency"],
+            "timestamp": datetime.now().isoformat(),
+            **extra,
+        }
+
+        for subscription in list(self._subscribers):
+            if not subscription.matches(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._coalesce(subscription, event["id"])
+
+        return event
+
+    @staticmethod
+    def _coalesce(subscription: Subscription, event_id: int):
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.coalesced += 1
+        subscription.queue.put_nowait({
+            "id": event_id,
+            "type": "resync",
+            "timestamp": datetime.now().isoformat(),
+        })
+
+    @staticmethod
+    def format_sse(event: Dict) -> str:
+        """Encode an event in text/event-stream format"""
+        return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
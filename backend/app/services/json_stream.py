@@ -0,0 +1,82 @@
+"""
+Incremental JSON object scanner for streamed LLM output
+Finds the first complete top-level {...} object as tokens arrive
+"""
+from typing import Optional
+
+
+class JsonObjectScanner:
+    """
+    Tracks brace depth and string state across streamed chunks
+
+    Text before the first "{" (prose, a ```json fence) is skipped, up to
+    max_preamble characters. feed() returns the object's text as soon as
+    its closing brace arrives, so the caller can stop the stream there.
+    """
+
+    def __init__(self, max_preamble: int = 200, max_length: int = 4000):
+        """
+        Args:
+            max_preamble: Characters allowed before the object starts
+            max_length: Characters allowed in the object itself
+        """
+        self.max_preamble = max_preamble
+        self.max_length = max_length
+        self._preamble = 0
+        self._parts = []
+        self._length = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def started(self) -> bool:
+        return self._depth > 0
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Consume a chunk of generated text
+
+        Returns:
+            The complete object text once it has closed, else None
+
+        Raises:
+            ValueError: the output is not heading toward a JSON object
+        """
+        start = 0
+        if self._depth == 0:
+            brace = chunk.find("{")
+            if brace < 0:
+                self._preamble += len(chunk)
+                if self._preamble > self.max_preamble:
+                    raise ValueError("no JSON object in model output")
+                return None
+            self._preamble += brace
+            if self._preamble > self.max_preamble:
+                raise ValueError("no JSON object in model output")
+            start = brace
+
+        for i in range(start, len(chunk)):
+            char = chunk[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[start:i + 1])
+                    return "".join(self._parts)
+
+        self._parts.append(chunk[start:])
+        self._length += len(chunk) - start
+        if self._length > self.max_length:
+            raise ValueError("JSON object in model output is too long")
+        return None
@@ -0,0 +1,241 @@
+"""
+Knowledge base document store
+Markdown discovered under a directory; sections indexed at startup, text read on demand
+"""
+import hashlib
+import os
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.cache import LRUCache
+from app.services.knowledge_index import (
+    KnowledgeIndex,
+    SearchIndex,
+    Section,
+    SectionTerms,
+    SuggestionIndex,
+    parse_sections,
+)
+
+
+def discover(root: str) -> Iterator[Tuple[str, str]]:
+    """
+    Markdown files under root, in a stable order
+
+    Yields:
+        (name, filepath); name is the path relative to root with "/"
+        separators, e.g. "pto_policy.md" or "benefits/dental.md"
+    """
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = sorted(d for d in subdirectories if not d.startswith("."))
+        for filename in sorted(filenames):
+            if filename.endswith(".md") and not filename.startswith("."):
+                filepath = os.path.join(directory, filename)
+                yield os.path.relpath(filepath, root).replace(os.sep, "/"), filepath
+
+
+def digest(data: bytes) -> str:
+    """Content hash used to tell real edits from touched files"""
+    return hashlib.sha1(data).hexdigest()
+
+
+class Document:
+    """Metadata for one knowledge base file"""
+
+    __slots__ = ("name", "filepath", "size", "mtime", "digest", "title", "sections")
+
+    def __init__(
+        self, name: str, filepath: str, size: int, mtime: float, digest: str, title: str, sections: int
+    ):
+        self.name = name
+        self.filepath = filepath
+        self.size = size
+        self.mtime = mtime
+        self.digest = digest
+        self.title = title
+        self.sections = sections
+
+
+class TextStore:
+    """
+    Document text keyed by (filepath, content digest)
+
+    Kept in an LRU bounded by total size and read back from disk on a miss.
+    A re-read whose content no longer matches the digest returns "", so a
+    section never quotes offsets from a newer version of its file.
+    """
+
+    def __init__(self, cache_bytes: int):
+        self.cache = LRUCache(maxsize=1 << 20, maxbytes=cache_bytes)
+        self.reads = 0
+
+    def read(self, filepath: str) -> bytes:
+        self.reads += 1
+        with open(filepath, "rb") as f:
+            return f.read()
+
+    def put(self, filepath: str, content_digest: str, text: str):
+        self.cache.set((filepath, content_digest), text)
+
+    def discard(self, filepath: str, content_digest: str):
+        self.cache.delete((filepath, content_digest))
+
+    def get(self, filepath: str, content_digest: str) -> str:
+        text = self.cache.get((filepath, content_digest))
+        if text is not None:
+            return text
+        try:
+            data = self.read(filepath)
+            if digest(data) != content_digest:
+                return ""
+            text = data.decode("utf-8")
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Warning: could not read {filepath}: {e}")
+            return ""
+        self.put(filepath, content_digest, text)
+        return text
+
+
+class KnowledgeBase:
+    """
+    Snapshot of the markdown documents under a directory, with their indexes
+
+    Building a snapshot reads each file once to record its metadata and
+    section offsets; document text is then read back on demand through a
+    size-bounded cache, so memory does not grow with the corpus.
+
+    A snapshot is not modified once built. refresh() builds the next one,
+    re-chunking and recounting only files that were added, removed or
+    edited, while this one keeps serving until the caller swaps it out.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        cache_bytes: int = 8 * 1024 * 1024,
+        previous: Optional["KnowledgeBase"] = None,
+        changed: Iterable[str] = (),
+    ):
+        """
+        Args:
+            root: Directory searched recursively for .md files
+            cache_bytes: Bytes of document text kept in memory
+            previous: Snapshot whose unchanged documents are reused
+            changed: Names of documents to re-read instead of reusing
+        """
+        self.root = root
+        self.changed: FrozenSet[str] = frozenset(changed)
+        self.documents: Dict[str, Document] = {}
+        self.sections: List[Section] = []
+        self._file_sections: Dict[str, List[Section]] = {}
+        self.text = previous.text if previous else TextStore(cache_bytes)
+
+        if not os.path.isdir(root):
+            print(f"Warning: knowledge base directory {root} not found")
+        else:
+            for name, filepath in discover(root):
+                if previous and name in previous.documents and name not in self.changed:
+                    self.documents[name] = previous.documents[name]
+                    self._file_sections[name] = previous._file_sections[name]
+                    self.sections.extend(previous._file_sections[name])
+                    continue
+                try:
+                    self._add(name, filepath)
+                except (OSError, UnicodeDecodeError) as e:
+                    print(f"Warning: could not read {name}: {e}")
+
+        self.terms = SectionTerms(self.sections, previous.terms if previous else None, self.changed)
+        self.resolution_index = KnowledgeIndex(self.sections, self.terms)
+        self.search_index = SearchIndex(self.sections, self.terms)
+        self.suggestion_index = SuggestionIndex(
+            self.sections,
+            previous=previous.suggestion_index if previous else None,
+            changed=self.changed,
+        )
+
+    def _add(self, name: str, filepath: str):
+        stat = os.stat(filepath)
+        data = self.text.read(filepath)
+        content_digest = digest(data)
+        text = data.decode("utf-8")
+        self.text.put(filepath, content_digest, text)
+
+        def source(_: str, filepath=filepath, content_digest=content_digest) -> str:
+            return self.text.get(filepath, content_digest)
+
+        sections = parse_sections(name, text, source)
+        top = [section.heading for section in sections if section.level == 1]
+        title = top[0] if top else name.rsplit("/", 1)[-1].replace(".md", "").replace("_", " ").title()
+        self.documents[name] = Document(
+            name, filepath, stat.st_size, stat.st_mtime, content_digest, title, len(sections)
+        )
+        self._file_sections[name] = sections
+        self.sections.extend(sections)
+
+    def discard_replaced(self, previous: "KnowledgeBase"):
+        """
+        Drop cached text of the previous snapshot's edited and removed files
+
+        Call once this snapshot has replaced previous, so requests still
+        reading previous keep its text until the swap.
+        """
+        for name in self.changed:
+            document = previous.documents.get(name)
+            if document is not None:
+                self.text.discard(document.filepath, document.digest)
+
+    def refresh(self) -> Optional["KnowledgeBase"]:
+        """
+        Check the directory for added, removed and edited files
+
+        A file whose size and mtime are unchanged is skipped; otherwise its
+        content hash decides, so a touched but identical file is not
+        reindexed.
+
+        Returns:
+            A new snapshot if anything changed, else None
+        """
+        found = dict(discover(self.root)) if os.path.isdir(self.root) else {}
+        changed = set(self.documents) - set(found)
+        for name, filepath in found.items():
+            document = self.documents.get(name)
+            if document is None:
+                changed.add(name)
+                continue
+            try:
+                stat = os.stat(filepath)
+                if stat.st_size == document.size and stat.st_mtime == document.mtime:
+                    continue
+                if digest(self.text.read(filepath)) != document.digest:
+                    changed.add(name)
+                else:
+                    # Same content; remember the new mtime so it is not hashed again
+                    document.mtime = stat.st_mtime
+            except OSError:
+                changed.add(name)
+
+        if not changed:
+            return None
+        return KnowledgeBase(self.root, previous=self, changed=changed)
+
+    def body(self, name: str) -> str:
+        """Full text of a document, or "" if it is unknown or unreadable"""
+        document = self.documents.get(name)
+        if document is None:
+            return ""
+        return self.text.get(document.filepath, document.digest)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.documents
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def stats(self) -> Dict:
+        """Corpus size and text cache usage for health output"""
+        return {
+            "documents": len(self.documents),
+            "sections": len(self.sections),
+            "corpus_bytes": sum(document.size for document in self.documents.values()),
+            "file_reads": self.text.reads,
+            "text_cache": self.text.cache.stats(),
+        }
@@ -0,0 +1,594 @@
+"""
+Knowledge base retrieval, search and typeahead indexes
+Markdown split into heading sections, ranked by TF-IDF similarity or BM25 in NumPy
+"""
+import bisect
+import math
+import re
+from array import array
+from collections import Counter
+from itertools import groupby
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.services.phrase_matcher import fold_plural, tokenize
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+WORD_PATTERN = re.compile(r"\w+")
+
+# Function words that carry no topic signal in HR questions
+STOPWORDS = frozenset("""
+    a an and are as at be been but by can could do does for from has have how
+    i if in is it its me my of on or our should so than that the their them
+    then there these they this to us was we were what when where which who
+    why will with would you your
+""".split())
+
+# A section's own heading words describe all of it, so they count this many times
+HEADING_WEIGHT = 3
+
+# Share of a section's vector length used to normalize it; the rest is the
+# corpus average, so longer sections are penalized less than under cosine
+LENGTH_PIVOT_SLOPE = 0.7
+
+
+def index_terms(words: Iterable[str]) -> List[str]:
+    """
+    Index terms from word tokens: stopwords and single characters dropped,
+    plurals folded
+
+    A one-character token also joins onto the token before it, so
+    "401(k)" and "W-2" (tokenized apart) meet the "401k" and "w2" people type.
+    """
+    terms = []
+    previous = None
+    for word in words:
+        if previous is not None and len(word) == 1 and previous not in STOPWORDS:
+            terms.append(previous + word)
+        previous = word
+        if word in STOPWORDS or len(word) == 1:
+            continue
+        terms.append(fold_plural(word))
+    return terms
+
+
+class Section:
+    """
+    One heading-level chunk of a knowledge base document
+
+    Only the location of the text is kept; text reads it through the
+    document source, so section metadata stays small for a large corpus.
+    """
+
+    __slots__ = ("file", "heading", "path", "level", "start", "end", "_source")
+
+    def __init__(
+        self, file: str, heading: str, path: str, level: int,
+        start: int, end: int, source: Callable[[str], str],
+    ):
+        self.file = file
+        self.heading = heading
+        # Breadcrumb of enclosing headings, e.g. "Benefits > Retirement > 401(k) Plan"
+        self.path = path
+        self.level = level
+        # Character offsets of the section text in its document
+        self.start = start
+        self.end = end
+        self._source = source
+
+    @property
+    def text(self) -> str:
+        return self._source(self.file)[self.start:self.end]
+
+
+def parse_sections(file: str, markdown: str, source: Optional[Callable[[str], str]] = None) -> List[Section]:
+    """
+    Split a markdown document at its headings
+
+    Each section holds the text up to the next heading of any level.
+    Headings with no text of their own (only subsections) are dropped,
+    but still appear in their subsections' paths.
+
+    Args:
+        file: Document name
+        markdown: Document text
+        source: Returns a document's text by name when a section's text is
+            read (default: keep this markdown string)
+    """
+    if source is None:
+        source = lambda _: markdown
+    sections = []
+    trail: List[Tuple[int, str]] = []
+    heading, level, start = None, 0, 0
+    in_code = False
+    offset = 0
+
+    def close(end):
+        if heading is None:
+            return
+        body = markdown[start:end]
+        stripped = body.strip()
+        if stripped:
+            text_start = start + len(body) - len(body.lstrip())
+            path = " > ".join(title for _, title in trail)
+            sections.append(Section(file, heading, path, level, text_start, text_start + len(stripped), source))
+
+    for line in markdown.splitlines(keepends=True):
+        line_start, offset = offset, offset + len(line)
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else HEADING_PATTERN.match(line)
+        if match is None:
+            continue
+
+        close(line_start)
+        level, heading, start = len(match.group(1)), match.group(2), offset
+        while trail and trail[-1][0] >= level:
+            trail.pop()
+        trail.append((level, heading))
+    close(offset)
+    return sections
+
+
+def section_terms(section: Section) -> Counter:
+    """Term counts of a section: its heading weighted up, then its breadcrumb and text"""
+    ancestors = section.path[:-len(section.heading)]
+    return Counter(
+        index_terms(tokenize(section.heading)) * HEADING_WEIGHT
+        + index_terms(tokenize(ancestors))
+        + index_terms(tokenize(section.text))
+    )
+
+
+def _by_file(sections: List[Section]) -> Iterator[Tuple[str, List[Section]]]:
+    """Sections grouped by document (each document's sections are contiguous)"""
+    for file, group in groupby(sections, key=lambda section: section.file):
+        yield file, list(group)
+
+
+class SectionTerms:
+    """
+    Sparse section x term counts, grouped by term
+
+    Built from per-document counts kept as flat NumPy arrays, then shared
+    by the indexes, which derive their weights from it with array
+    arithmetic. Postings of a term are the slice offsets[t]:offsets[t + 1].
+    A rebuild reuses the counts of every document that has not changed.
+    """
+
+    def __init__(
+        self,
+        sections: List[Section],
+        previous: Optional["SectionTerms"] = None,
+        changed: Iterable[str] = (),
+    ):
+        """
+        Args:
+            sections: Sections to count, grouped by document
+            previous: An earlier build whose per-document counts can be reused
+            changed: Documents whose counts must not be reused
+        """
+        changed = set(changed)
+        self.section_count = len(sections)
+        # Copied, so the previous build stays consistent while it is still served
+        self.vocabulary: Dict[str, int] = dict(previous.vocabulary) if previous else {}
+        self.by_file: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+        parts = []
+        offset = 0
+        for file, group in _by_file(sections):
+            part = previous.by_file.get(file) if previous and file not in changed else None
+            if part is None:
+                part = self._count(group)
+            self.by_file[file] = part
+            term_ids, local_ids, counts = part
+            parts.append((term_ids, local_ids + offset, counts))
+            offset += len(group)
+
+        term_ids = np.concatenate([part[0] for part in parts]) if parts else np.zeros(0, np.int32)
+        order = np.argsort(term_ids, kind="stable")
+        self.term_ids = term_ids[order]
+        self.section_ids = (np.concatenate([part[1] for part in parts]) if parts else np.zeros(0, np.int32))[order]
+        self.counts = (np.concatenate([part[2] for part in parts]) if parts else np.zeros(0, np.float32))[order]
+        self.document_frequency = np.bincount(self.term_ids, minlength=len(self.vocabulary))
+        self.offsets = np.concatenate(([0], np.cumsum(self.document_frequency)))
+        self.lengths = np.bincount(self.section_ids, weights=self.counts, minlength=self.section_count)
+
+    def _count(self, sections: List[Section]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(term ids, section ids within the document, counts) for one document"""
+        term_ids, section_ids, counts = array("i"), array("i"), array("f")
+        for section_id, section in enumerate(sections):
+            for term, tf in section_terms(section).items():
+                term_ids.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                section_ids.append(section_id)
+                counts.append(tf)
+        return (
+            np.frombuffer(term_ids, dtype=np.int32),
+            np.frombuffer(section_ids, dtype=np.int32),
+            np.frombuffer(counts, dtype=np.float32),
+        )
+
+
+def _score_postings(ids: np.ndarray, values: np.ndarray, section_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum posting values per section
+
+    Returns:
+        (section ids, scores) of the sections the postings hit, ids ascending
+    """
+    # Sorting the postings is O(p log p), cheaper than a corpus-sized
+    # bincount until a query hits a sizeable share of the sections
+    if len(ids) * 8 < section_count:
+        matched, slots = np.unique(ids, return_inverse=True)
+        return matched, np.bincount(slots, weights=values)
+    scores = np.bincount(ids, weights=values, minlength=section_count)
+    matched = np.flatnonzero(scores)
+    return matched, scores[matched]
+
+
+class KnowledgeIndex:
+    """
+    TF-IDF index over knowledge base sections
+
+    Stored as an inverted index of NumPy arrays (term -> section ids and
+    normalized weights), so a query only touches the postings of its own
+    terms and scoring is one bincount over the sections they hit,
+    independent of vocabulary and corpus size.
+    """
+
+    def __init__(self, sections: List[Section], terms: Optional[SectionTerms] = None):
+        """
+        Args:
+            sections: Sections to index (see parse_sections)
+            terms: Their term counts, if already built for another index
+        """
+        self.sections = sections
+        terms = terms or SectionTerms(sections)
+        self._vocabulary = terms.vocabulary
+        self._offsets = terms.offsets
+        self._section_ids = terms.section_ids
+
+        count = terms.section_count
+        self.idf = np.log((1 + count) / (1 + terms.document_frequency)) + 1
+        weights = (1 + np.log(terms.counts)) * self.idf[terms.term_ids]
+        norms = np.sqrt(np.bincount(terms.section_ids, weights=weights * weights, minlength=count))
+        # Pivoted normalization: plain cosine over-rewards one-line sections
+        pivot = (1 - LENGTH_PIVOT_SLOPE) * (norms.mean() if count else 1.0) + LENGTH_PIVOT_SLOPE * norms
+        self._weights = (weights / pivot[terms.section_ids]).astype(np.float32)
+
+        files = sorted({section.file for section in sections})
+        self._file_ids = {file: i for i, file in enumerate(files)}
+        self._section_files = np.array(
+            [self._file_ids[section.file] for section in sections], dtype=np.int32
+        )
+
+        # Heading terms along each section's path, leaving out headings every
+        # section of the document shares (its title); and per document, the
+        # multi-word headings a query can name
+        self._topics: Dict[Tuple[str, int], List[FrozenSet[str]]] = {}
+        self._headings: Dict[str, Set[FrozenSet[str]]] = {}
+        for file, group in _by_file(sections):
+            trails = [
+                [frozenset(index_terms(tokenize(heading))) for heading in section.path.split(" > ")]
+                for section in group
+            ]
+            common = set.intersection(*map(set, trails)) if len(group) > 1 else set()
+            headings = self._headings[file] = set()
+            for section, trail in zip(group, trails):
+                trail = [heading for heading in trail if heading and heading not in common]
+                self._topics[(file, section.start)] = trail
+                headings.update(heading for heading in trail if len(heading) > 1)
+
+    def search(
+        self,
+        words: List[str],
+        k: int = 3,
+        file_boost: Optional[Dict[str, float]] = None,
+    ) -> List[Tuple[Section, float]]:
+        """
+        Top-k sections by cosine similarity to a tokenized query
+
+        Args:
+            words: Query word tokens (see phrase_matcher.tokenize)
+            k: Number of sections to return
+            file_boost: Score multiplier per file name
+
+        Returns:
+            (section, score) pairs, best first; only sections sharing a term
+        """
+        query = Counter(
+            self._vocabulary[term] for term in index_terms(words) if term in self._vocabulary
+        )
+        if not query:
+            return []
+
+        weights = {term_id: (1 + math.log(tf)) * self.idf[term_id] for term_id, tf in query.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        postings = [slice(self._offsets[term_id], self._offsets[term_id + 1]) for term_id in weights]
+        ids = np.concatenate([self._section_ids[span] for span in postings])
+        values = np.concatenate([
+            self._weights[span] * (w / norm) for span, w in zip(postings, weights.values())
+        ])
+        matched, scores = _score_postings(ids, values, len(self.sections))
+
+        if file_boost:
+            boost = np.ones(len(self._file_ids))
+            for file, factor in file_boost.items():
+                if file in self._file_ids:
+                    boost[self._file_ids[file]] = factor
+            scores *= boost[self._section_files[matched]]
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.sections[matched[i]], float(scores[i])) for i in top if scores[i] > 0]
+
+    def on_topic(self, section: Section, words: List[str]) -> bool:
+        """
+        Whether a section's headings fit a tokenized query
+
+        A section matched only through its body text (a passing mention) is
+        off topic, as is one outside a heading the query names: a query
+        containing every term of a multi-word heading of the section's
+        document ("health insurance") must be answered from under it.
+        """
+        query = set(index_terms(words))
+        trail = self._topics.get((section.file, section.start), [])
+        if not any(heading & query for heading in trail):
+            return False
+        named = {heading for heading in self._headings.get(section.file, ()) if heading <= query}
+        return named <= set(trail)
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+
+class SearchIndex:
+    """
+    BM25 inverted index over knowledge base sections, for keyword search
+
+    Each posting stores its precomputed BM25 term weight, so a query is one
+    bincount over the postings of its own terms, compacted to the sections
+    they hit; a selective query's latency follows its postings, not the
+    size of the corpus. Documents are ranked by their best-scoring section.
+    """
+
+    def __init__(
+        self, sections: List[Section], terms: Optional[SectionTerms] = None, k1: float = 1.2, b: float = 0.75
+    ):
+        """
+        Args:
+            sections: Sections to index (see parse_sections)
+            terms: Their term counts, if already built for another index
+            k1: Term frequency saturation
+            b: Strength of section length normalization
+        """
+        self.sections = sections
+        terms = terms or SectionTerms(sections)
+        self._vocabulary = terms.vocabulary
+        self._offsets = terms.offsets
+        self._section_ids = terms.section_ids
+
+        count = terms.section_count
+        df = terms.document_frequency
+        idf = np.log(1 + (count - df + 0.5) / (df + 0.5))
+        average_length = terms.lengths.mean() if count else 1.0
+        length_norm = k1 * (1 - b + b * terms.lengths / average_length)
+        tf = terms.counts
+        self._weights = (
+            idf[terms.term_ids] * tf * (k1 + 1) / (tf + length_norm[terms.section_ids])
+        ).astype(np.float32)
+
+    def search(
+        self, words: List[str], limit: int = 10, sections_per_document: int = 3
+    ) -> List[Tuple[str, float, List[Tuple[Section, float]]]]:
+        """
+        Rank documents for a tokenized query
+
+        Args:
+            words: Query word tokens (see phrase_matcher.tokenize)
+            limit: Maximum number of documents
+            sections_per_document: Matching sections kept per document
+
+        Returns:
+            (file, score, [(section, score), ...]) per document, best first
+        """
+        postings = [
+            slice(self._offsets[term_id], self._offsets[term_id + 1])
+            for term_id in {self._vocabulary[term] for term in index_terms(words) if term in self._vocabulary}
+        ]
+        if not postings:
+            return []
+
+        ids = np.concatenate([self._section_ids[span] for span in postings])
+        values = np.concatenate([self._weights[span] for span in postings])
+        matched, scores = _score_postings(ids, values, len(self.sections))
+
+        # Enough top sections to fill `limit` documents in the usual case
+        order = np.arange(len(matched))
+        keep = limit * sections_per_document * 4
+        if len(order) > keep:
+            order = np.sort(np.argpartition(-scores, keep - 1)[:keep])
+        order = order[np.argsort(-scores[order], kind="stable")]
+
+        documents: Dict[str, List[Tuple[Section, float]]] = {}
+        for slot in order:
+            section = self.sections[matched[slot]]
+            hits = documents.setdefault(section.file, [])
+            if len(hits) < sections_per_document:
+                hits.append((section, float(scores[slot])))
+
+        ranked = [(file, hits[0][1], hits) for file, hits in documents.items()]
+        return ranked[:limit]
+
+
+def snippet(section: Section, words: List[str], width: int = 160) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    The section line that best matches a query, with the matched words marked
+
+    Args:
+        section: Section to quote
+        words: Query word tokens
+        width: Maximum snippet length in characters
+
+    Returns:
+        (snippet text, [(start, end), ...] character spans of matched words)
+    """
+    terms = set(index_terms(words))
+    best_line, best_spans, best_hits = "", [], 0
+    for line in section.text.splitlines():
+        line = line.replace("**", "").strip().lstrip("-*").strip()
+        spans, hits = _match_spans(line, terms)
+        if len(hits) > best_hits:
+            best_line, best_spans, best_hits = line, spans, len(hits)
+    if not best_line:
+        best_line = (section.text.replace("**", "").strip().splitlines() or [""])[0]
+
+    if len(best_line) > width:
+        start = max(0, best_spans[0][0] - width // 4) if best_spans else 0
+        end = start + width
+        best_spans = [(s - start, e - start) for s, e in best_spans if s >= start and e <= end]
+        best_line = best_line[start:end]
+    return best_line, best_spans
+
+
+def _match_spans(line: str, terms: set) -> Tuple[List[Tuple[int, int]], set]:
+    """Spans of words in line whose index term is in terms"""
+    spans, hits = [], set()
+    previous = None
+    for match in WORD_PATTERN.finditer(line):
+        word = match.group().lower()
+        compound = previous.group().lower() + word if previous is not None and len(word) == 1 else None
+        if compound in terms:
+            hits.add(compound)
+            if spans and spans[-1][0] == previous.start():
+                spans.pop()
+            end = match.end()
+            if line[previous.end():match.start()] == "(" and line[end:end + 1] == ")":
+                end += 1
+            spans.append((previous.start(), end))
+        else:
+            term = index_terms([word])
+            if term and term[0] in terms:
+                hits.add(term[0])
+                spans.append(match.span())
+        previous = match
+    return spans, hits
+
+
+class SuggestionIndex:
+    """
+    Typeahead completions over knowledge base headings and frequent words
+
+    Completions are kept as a sorted array of normalized keys, so the
+    matches for a prefix are one contiguous range found by binary search;
+    the top-N of that range by frequency is an argpartition. A heading is
+    keyed from each of its words, so "pto" also completes "How to Request PTO".
+    """
+
+    def __init__(
+        self,
+        sections: List[Section],
+        min_count: int = 2,
+        previous: Optional["SuggestionIndex"] = None,
+        changed: Iterable[str] = (),
+    ):
+        """
+        Args:
+            sections: Sections to draw completions from, grouped by document
+            min_count: Occurrences a word needs to be offered on its own
+            previous: An earlier build whose per-document counts can be reused
+            changed: Documents whose counts must not be reused
+        """
+        changed = set(changed)
+        self._vocabulary: Dict[str, int] = dict(previous._vocabulary) if previous else {}
+        self._by_file: Dict[str, Tuple[np.ndarray, np.ndarray, List[str]]] = {}
+        headings: Counter = Counter()
+        for file, group in _by_file(sections):
+            part = previous._by_file.get(file) if previous and file not in changed else None
+            if part is None:
+                part = self._count(group)
+            self._by_file[file] = part
+            headings.update(part[2])
+
+        parts = list(self._by_file.values())
+        totals = np.bincount(
+            np.concatenate([part[0] for part in parts]) if parts else np.zeros(0, np.int32),
+            weights=np.concatenate([part[1] for part in parts]) if parts else None,
+            minlength=len(self._vocabulary),
+        ).astype(np.int64)
+        words = {word: int(totals[i]) for word, i in self._vocabulary.items() if totals[i]}
+
+        # A heading ranks by how often its rarest word occurs, plus its own count
+        entries: Dict[str, Tuple[int, str]] = {}
+        for word, count in words.items():
+            if count >= min_count:
+                entries[word] = (count, "term")
+        for heading, count in headings.items():
+            heading_words = [word for word in tokenize(heading) if word in words]
+            frequency = count + min((words[word] for word in heading_words), default=0)
+            entries[heading] = (frequency, "heading")
+
+        keys = []
+        for text, (count, _) in entries.items():
+            tokens = tokenize(text)
+            for start in range(len(tokens)):
+                if start == 0 or tokens[start] not in STOPWORDS:
+                    keys.append((" ".join(tokens[start:]), text))
+        keys.sort()
+
+        self._keys = [key for key, _ in keys]
+        self._texts = [text for _, text in keys]
+        self._counts = np.array([entries[text][0] for text in self._texts], dtype=np.int32)
+        self._kinds = {text: kind for text, (_, kind) in entries.items()}
+
+    def _count(self, sections: List[Section]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """(word ids, word counts, headings) for one document"""
+        words = Counter(
+            word
+            for section in sections
+            for word in tokenize(section.heading + "\n" + section.text)
+            if len(word) > 2 and word not in STOPWORDS and not word.isdigit()
+        )
+        ids = [self._vocabulary.setdefault(word, len(self._vocabulary)) for word in words]
+        return (
+            np.array(ids, dtype=np.int32),
+            np.array(list(words.values()), dtype=np.float64),
+            [section.heading for section in sections],
+        )
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict]:
+        """
+        Most frequent completions of a typed prefix
+
+        Args:
+            prefix: Text typed so far
+            limit: Maximum number of completions
+
+        Returns:
+            [{"text", "type" ("heading" or "term"), "count"}], most frequent first
+        """
+        key = " ".join(tokenize(prefix))
+        if not key:
+            return []
+        low = bisect.bisect_left(self._keys, key)
+        high = bisect.bisect_left(self._keys, key + "￿", low)
+        if low == high:
+            return []
+
+        # A heading can match from several of its words; over-fetch, then dedupe
+        counts = self._counts[low:high]
+        fetch = min(len(counts), limit * 3)
+        top = np.argpartition(-counts, fetch - 1)[:fetch]
+        top = top[np.lexsort((top, -counts[top]))]
+
+        suggestions, seen = [], set()
+        for i in top:
+            text = self._texts[low + i]
+            if text not in seen:
+                seen.add(text)
+                suggestions.append({"text": text, "type": self._kinds[text], "count": int(counts[i])})
+                if len(suggestions) == limit:
+                    break
+        return suggestions
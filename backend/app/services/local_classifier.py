@@ -0,0 +1,267 @@
+"""
+Local ticket classifier
+TF-IDF features with softmax regression heads for category and urgency, in NumPy
+"""
+import json
+import math
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.phrase_matcher import tokenize
+
+LOCAL_CLASSIFIER_PATH = os.getenv("LOCAL_CLASSIFIER_PATH", "app/services/local_classifier.npz")
+
+# Candidate softmax temperatures for calibration
+TEMPERATURES = np.linspace(0.25, 10.0, 40)
+
+
+def ngrams(words: Sequence[str]) -> List[str]:
+    """Unigram and bigram features of a token list"""
+    return list(words) + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def _fit_softmax(X: np.ndarray, y: np.ndarray, n_classes: int, l2: float = 1e-4, steps: int = 1000, lr: float = 5.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Full-batch gradient descent on L2-regularized cross-entropy"""
+    W = np.zeros((X.shape[1], n_classes))
+    b = np.zeros(n_classes)
+    Y = np.eye(n_classes)[y]
+    for _ in range(steps):
+        error = (_softmax(X @ W + b) - Y) / len(X)
+        W -= lr * (X.T @ error + l2 * W)
+        b -= lr * error.sum(axis=0)
+    return W, b
+
+
+def _fit_temperature(logits: np.ndarray, y: np.ndarray) -> float:
+    """Temperature minimizing negative log-likelihood of held-out logits"""
+    best_t, best_nll = 1.0, math.inf
+    for t in TEMPERATURES:
+        probs = _softmax(logits / t)[np.arange(len(y)), y]
+        nll = -np.log(np.clip(probs, 1e-12, None)).mean()
+        if nll < best_nll:
+            best_t, best_nll = float(t), nll
+    return best_t
+
+
+class LocalClassifier:
+    """
+    Linear text classifier that runs on CPU with no network dependency
+
+    Trained offline (python -m app.services.local_classifier) and loaded
+    from a .npz file. Probabilities are temperature-scaled on
+    cross-validated predictions, so confidence tracks how often the model
+    is actually right.
+    """
+
+    def __init__(
+        self,
+        vocabulary: Sequence[str],
+        idf: np.ndarray,
+        categories: Sequence[str],
+        category_weights: Tuple[np.ndarray, np.ndarray],
+        urgencies: Sequence[str],
+        urgency_weights: Tuple[np.ndarray, np.ndarray],
+        temperature: float = 1.0,
+    ):
+        self.vocabulary = list(vocabulary)
+        self.index = {feature: i for i, feature in enumerate(self.vocabulary)}
+        self.idf = idf
+        self.categories = list(categories)
+        self.category_weights = category_weights
+        self.urgencies = list(urgencies)
+        self.urgency_weights = urgency_weights
+        self.temperature = temperature
+
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        categories: Sequence[str],
+        urgencies: Sequence[str],
+        seed_count: int = 0,
+        folds: int = 5,
+        seed: int = 0,
+    ) -> "LocalClassifier":
+        """
+        Fit both heads on labelled texts
+
+        Args:
+            texts: Ticket descriptions
+            categories: Category label per text
+            urgencies: Urgency label per text
+            seed_count: Number of leading examples that are synthetic seeds;
+                they are always trained on and never used for calibration
+            folds: Cross-validation folds used to fit the temperature
+            seed: Shuffle seed for the folds
+
+        Returns:
+            Trained classifier
+        """
+        docs = [ngrams(tokenize(text)) for text in texts]
+        vocabulary = sorted({feature for doc in docs for feature in doc})
+        index = {feature: i for i, feature in enumerate(vocabulary)}
+        document_frequency = np.zeros(len(vocabulary))
+        for doc in docs:
+            for feature in set(doc):
+                document_frequency[index[feature]] += 1
+        idf = np.log((1 + len(docs)) / (1 + document_frequency)) + 1
+
+        X = np.zeros((len(docs), len(vocabulary)))
+        for row, doc in enumerate(docs):
+            indices, values = cls._features(doc, index, idf)
+            X[row, indices] = values
+
+        category_labels = sorted(set(categories))
+        y_category = np.array([category_labels.index(c) for c in categories])
+        urgency_labels = sorted(set(urgencies))
+        y_urgency = np.array([urgency_labels.index(u) for u in urgencies])
+
+        # Out-of-fold category logits of real tickets for calibration
+        order = seed_count + np.random.default_rng(seed).permutation(len(docs) - seed_count)
+        held_out_logits = np.zeros((len(docs), len(category_labels)))
+        for fold in range(folds):
+            test = order[fold::folds]
+            train = np.setdiff1d(np.arange(len(docs)), test)
+            W, b = _fit_softmax(X[train], y_category[train], len(category_labels))
+            held_out_logits[test] = X[test] @ W + b
+        temperature = _fit_temperature(held_out_logits[order], y_category[order])
+
+        return cls(
+            vocabulary,
+            idf,
+            category_labels,
+            _fit_softmax(X, y_category, len(category_labels)),
+            urgency_labels,
+            _fit_softmax(X, y_urgency, len(urgency_labels)),
+            temperature,
+        )
+
+    @staticmethod
+    def _features(doc: Iterable[str], index: Dict[str, int], idf: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse L2-normalized sublinear TF-IDF vector (indices, values)"""
+        counts: Dict[int, int] = {}
+        for feature in doc:
+            i = index.get(feature)
+            if i is not None:
+                counts[i] = counts.get(i, 0) + 1
+        indices = np.fromiter(counts, dtype=np.intp, count=len(counts))
+        values = (1 + np.log(np.fromiter(counts.values(), dtype=float, count=len(counts)))) * idf[indices]
+        norm = np.linalg.norm(values)
+        return indices, (values / norm if norm else values)
+
+    def predict(self, text: str, words: Optional[List[str]] = None) -> Dict:
+        """
+        Classify one description
+
+        Args:
+            text: Ticket description
+            words: Tokens of text, if already computed
+
+        Returns:
+            Dict with category, confidence (0-100), urgency and top_terms
+        """
+        if words is None:
+            words = tokenize(text)
+        indices, values = self._features(ngrams(words), self.index, self.idf)
+
+        W, b = self.category_weights
+        probs = _softmax((values @ W[indices] + b) / self.temperature)
+        best = int(probs.argmax())
+
+        urgency_W, urgency_b = self.urgency_weights
+        urgency = self.urgencies[int((values @ urgency_W[indices] + urgency_b).argmax())]
+
+        # Features that pushed hardest toward the chosen category
+        contributions = values * W[indices, best]
+        top_terms = [
+            self.vocabulary[indices[i]]
+            for i in np.argsort(contributions)[::-1][:3]
+            if contributions[i] > 0
+        ]
+
+        return {
+            "category": self.categories[best],
+            "confidence": int(round(float(probs[best]) * 100)),
+            "urgency": urgency,
+            "top_terms": top_terms,
+        }
+
+    def save(self, path: str):
+        """Serialize weights and vocabulary to a .npz file"""
+        np.savez_compressed(
+            path,
+            vocabulary=np.array(self.vocabulary),
+            idf=self.idf,
+            categories=np.array(self.categories),
+            category_W=self.category_weights[0],
+            category_b=self.category_weights[1],
+            urgencies=np.array(self.urgencies),
+            urgency_W=self.urgency_weights[0],
+            urgency_b=self.urgency_weights[1],
+            temperature=np.array(self.temperature),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "LocalClassifier":
+        with np.load(path) as data:
+            return cls(
+                data["vocabulary"].tolist(),
+                data["idf"],
+                data["categories"].tolist(),
+                (data["category_W"], data["category_b"]),
+                data["urgencies"].tolist(),
+                (data["urgency_W"], data["urgency_b"]),
+                float(data["temperature"]),
+            )
+
+
+def training_examples(tickets_path: str = "app/services/mock_data.json") -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str, str]]]:
+    """
+    (description, category, urgency) examples from stored tickets and templates
+
+    Sensitive tickets are skipped: they never reach a classifier.
+
+    Returns:
+        (seeds, examples): seeds holds each category's keyword list as one
+        synthetic example, so words the keyword classifier knows are not
+        out-of-vocabulary here
+    """
+    from app.services.ai_service import AIService
+    from app.services.mock_data import TICKET_TEMPLATES
+
+    examples = set()
+    for category, templates in TICKET_TEMPLATES.items():
+        for template in templates:
+            if not template.get("sensitive"):
+                examples.add((template["description"], category, template["urgency"]))
+
+    if os.path.exists(tickets_path):
+        with open(tickets_path, "r") as f:
+            for ticket in json.load(f)["tickets"]:
+                if not ticket.get("sensitive"):
+                    examples.add((ticket["description"], ticket["category"], ticket["urgency"]))
+
+    seeds = [
+        (" ".join(keywords), category, "Low")
+        for category, keywords in AIService.KEYWORD_MAP.items()
+    ]
+    return seeds, sorted(examples)
+
+
+if __name__ == "__main__":
+    seeds, examples = training_examples()
+    texts, categories, urgencies = zip(*(seeds + examples))
+    model = LocalClassifier.train(texts, categories, urgencies, seed_count=len(seeds))
+    model.save(LOCAL_CLASSIFIER_PATH)
+
+    print(f"Trained local classifier on {len(examples)} tickets and {len(seeds)} keyword seeds")
+    print(f"Vocabulary: {len(model.vocabulary)} features, temperature {model.temperature:.2f}")
+    print(f"Saved to {LOCAL_CLASSIFIER_PATH}")
@@ -0,0 +1,178 @@
+"""
+Compiled multi-phrase matcher
+Finds whole-word occurrences of a phrase lexicon from one tokenization pass
+"""
+import string
+from functools import lru_cache
+from itertools import product
+from typing import Callable, Dict, Iterable, List, Optional, Set, Union
+
+# Punctuation that separates words (ASCII plus common typographic marks);
+# underscores stay inside words
+_SEPARATORS = str.maketrans({
+    char: " "
+    for char in (set(string.punctuation) - {"_"}) | set("‘’‚“”„–—…•·«»¡¿")
+})
+
+_VOWELS = frozenset("aeiou")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens of text"""
+    return text.lower().translate(_SEPARATORS).split()
+
+
+# Folds are pure and ticket vocabulary is small, so each word is folded once
+@lru_cache(maxsize=1 << 16)
+def fold_plural(word: str) -> str:
+    """
+    Singular form of a lowercased token: "policies" -> "policy",
+    "receipts" -> "receipt"; "access" and short words are left alone
+    """
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+@lru_cache(maxsize=1 << 16)
+def fold_inflections(word: str) -> str:
+    """
+    Light stem of a lowercased token for lexicons that name an act rather
+    than a thing: plural, "-ing" and "-ed" endings and a final "e" are
+    removed, so "threatens", "threatened" and "threatening" all fold to
+    "threaten", and "sue", "sues", "sued" and "suing" to "su"
+
+    Stems only ever compare with stems, so they need not be real words;
+    a phrase still has to match whole words ("issue" folds to "issu").
+    """
+    word = fold_plural(word)
+    if len(word) > 4 and word.endswith("ing"):
+        word = word[:-3]
+    elif len(word) > 4 and word.endswith("ied"):
+        word = word[:-3] + "y"
+    elif len(word) > 3 and word.endswith("ed"):
+        word = word[:-2]
+    # "stopped" -> "stop"; "harass" and "kill" keep their doubled letter
+    if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+        word = word[:-1]
+    if len(word) > 2 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def _inflect(base: str) -> Set[str]:
+    """Regular plural / third-person, "-ed" and "-ing" spellings of a word"""
+    forms = {base}
+    if len(base) > 1 and base[-1] == "y" and base[-2] not in _VOWELS:
+        forms.update((base[:-1] + "ies", base[:-1] + "ied", base + "ing"))
+        return forms
+
+    forms.add(base + "es" if base.endswith(("s", "x", "z", "ch", "sh")) else base + "s")
+    if base.endswith("e"):
+        forms.update((base + "d", base[:-1] + "ing"))
+    else:
+        # "stop" -> "stopped": one-syllable words ending consonant-vowel-consonant
+        vowels = [i for i, char in enumerate(base) if char in _VOWELS]
+        if len(vowels) == 1 and 0 < vowels[0] == len(base) - 2 and base[-1] not in "wxy":
+            base += base[-1]
+        forms.update((base + "ed", base + "ing"))
+    return forms
+
+
+def surface_forms(token: str, fold: Callable[[str], str]) -> Set[str]:
+    """
+    Spellings of a lowercased token that fold to the same form as it
+
+    Candidates are the regular inflections of the token and of its
+    singular; only those that actually fold back to the token's form are
+    kept, so the forms never match more than comparing folds would.
+    """
+    target = fold(token)
+    candidates = _inflect(token) | _inflect(fold_plural(token))
+    return {form for form in candidates if fold(form) == target}
+
+
+class PhraseMatcher:
+    """
+    Whole-word matcher for a fixed set of phrases
+
+    Phrases are compiled into token form once. Matching tokenizes the text
+    in one pass, finds single-word phrases with a set intersection, and
+    only searches for multi-word phrases whose first word actually occurs.
+    Cost is linear in the text and independent of lexicon size, and a
+    phrase never matches inside a longer word, so "sue" does not match
+    "issue". Punctuation inside a phrase is treated as a word break
+    ("w-2" matches "W-2" and "w 2").
+
+    An optional fold function makes a phrase word also match the text
+    words that fold to the same form, e.g. fold_plural so "receipt" also
+    matches "receipts". The phrase words are expanded into those surface
+    forms at compile time (see surface_forms), so scanning compares raw
+    text words and never folds them. A dict of phrase -> fold gives each
+    phrase its own (phrases not listed match exact words).
+    """
+
+    def __init__(
+        self,
+        phrases: Iterable[str],
+        fold: Union[Callable[[str], str], Dict[str, Callable[[str], str]], None] = None,
+    ):
+        self.phrases: Set[str] = set()
+        self.fold = fold
+        # single-word phrases, by surface form (forms of phrases can coincide)
+        self._single: Dict[str, List[str]] = {}
+        # first word -> [(" space-joined words ", other words, phrase)] for multi-word phrases
+        self._multi: Dict[str, List[tuple]] = {}
+
+        for phrase in phrases:
+            tokens = tokenize(phrase)
+            if not tokens:
+                continue
+            phrase_fold = fold.get(phrase) if isinstance(fold, dict) else fold
+            phrase = phrase.strip().lower()
+            self.phrases.add(phrase)
+            spellings = [surface_forms(token, phrase_fold) if phrase_fold else [token] for token in tokens]
+            if len(tokens) == 1:
+                for form in spellings[0]:
+                    self._single.setdefault(form, []).append(phrase)
+            else:
+                for words in product(*spellings):
+                    self._multi.setdefault(words[0], []).append(
+                        (f" {' '.join(words)} ", frozenset(words[1:]), phrase)
+                    )
+
+        self._single_tokens = frozenset(self._single)
+        self._multi_starts = frozenset(self._multi)
+
+    def matched(self, text: str) -> Set[str]:
+        """Distinct phrases present in text"""
+        return self.matched_words(tokenize(text))
+
+    def matched_words(self, words: List[str], word_set: Optional[Set[str]] = None) -> Set[str]:
+        """
+        Distinct phrases present in an already tokenized text
+
+        Args:
+            words: Word tokens in text order
+            word_set: set(words), if the caller already has it
+        """
+        if word_set is None:
+            word_set = set(words)
+        hits = {phrase for word in word_set & self._single_tokens for phrase in self._single[word]}
+
+        starts = word_set & self._multi_starts
+        if starts:
+            # Space-padded text makes every substring hit a whole-word hit
+            joined = f" {' '.join(words)} "
+            for first in starts:
+                for needle, rest, phrase in self._multi[first]:
+                    # Only scan for phrases whose every word occurs
+                    if rest <= word_set and needle in joined:
+                        hits.add(phrase)
+
+        return hits
+
+    def __len__(self) -> int:
+        return len(self.phrases)
@@ -3,25 +3,36 @@ PII Detection and Redaction Service
 Detects and redacts sensitive personal information
 """
 import re
-from typing import List, Tuple
+import time
+from typing import List, Optional, Tuple
+
+from app.services.metrics import STAGE_LATENCY
+from app.services.phrase_matcher import fold_plural
+from app.services.text_analyzer import TextAnalysis, TextAnalyzer
 
 class PIIDetector:
     """Detects and redacts PII from text"""
     
-    # Regex patterns for common PII
-    SSN_PATTERN = r'\b\d{3}-\d{2}-\d{4}\b'
-    CREDIT_CARD_PATTERN = r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b'
-    PHONE_PATTERN = r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'
+    # Regex patterns for common PII. The number patterns start with a digit
+    # and check the word boundary behind it ("\d(?<!\w\d)" is "\b\d"), so
+    # the regex engine can skip ahead to digits instead of trying every position
+    SSN_PATTERN = r'\d(?<!\w\d)\d{2}-\d{2}-\d{4}\b'
+    CREDIT_CARD_PATTERN = r'\d(?<!\w\d)\d{3}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b'
+    PHONE_PATTERN = r'\d(?<!\w\d)\d{2}[-.]?\d{3}[-.]?\d{4}\b'
     EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
     SALARY_PATTERN = r'\$\s?\d{1,3}(,\d{3})*(\.\d{2})?'
     
-    # Medical terms (simplified list)
+    # Medical terms (simplified list, whole-word matches, plurals included)
     MEDICAL_TERMS = [
-        'diabetes', 'cancer', 'HIV', 'AIDS', 'depression', 'anxiety',
+        'diabetes', 'cancer', 'HIV', 'depression', 'anxiety',
         'therapy', 'medication', 'prescription', 'diagnosis', 'treatment',
-        'medical condition', 'health issue', 'doctor', 'hospital'
+        'medical condition', 'health issue', 'doctor', 'hospital', 'hospitalized'
     ]
     
+    # Medical acronyms that are everyday words in lowercase ("hearing aids");
+    # only matched as written
+    MEDICAL_ACRONYMS = ['AIDS']
+    
     def __init__(self):
         self.patterns = {
             'SSN': self.SSN_PATTERN,
@@ -30,111 +41,82 @@ class PIIDetector:
             'EMAIL': self.EMAIL_PATTERN,  
             'SALARY': self.SALARY_PATTERN,
         }
+        self.analyzer = TextAnalyzer(
+            self.patterns,
+            {'medical': self.MEDICAL_TERMS, 'medical_acronym': self.MEDICAL_ACRONYMS},
+            folding={'medical': fold_plural},
+        )
     
-    def detect_pii_types(self, text: str) -> List[str]:
+    def detect_pii_types(self, text: str, analysis: Optional[TextAnalysis] = None) -> List[str]:
         """
         Detect what types of PII are present in text
         
         Args:
             text: Input text to analyze
+            analysis: Shared scan of text, if the caller already has one
             
         Returns:
             List of PII types detected
         """
-        detected = []
-        
-        # Check regex patterns
-        for pii_type, pattern in self.patterns.items():
-            if re.search(pattern, text, re.IGNORECASE):
-                detected.append(pii_type)
-        
-        # Check medical terms
-        text_lower = text.lower()
-        for term in self.MEDICAL_TERMS:
-            if term in text_lower:
-                detected.append('MEDICAL_INFO')
-                break
+        if analysis is None:
+            analysis = self.analyzer.analyze(text)
         
-        return list(set(detected))  # Remove duplicates
+        detected = analysis.pii_types
+        # Medical terms are whole-word matches
+        if analysis.hits('medical') or self._has_medical_acronym(analysis):
+            detected.append('MEDICAL_INFO')
+        return detected
     
-    def redact(self, text: str) -> Tuple[str, List[str]]:
+    def _has_medical_acronym(self, analysis: TextAnalysis) -> bool:
+        """Whether an acronym the lexicon found (case-insensitively) is written in capitals"""
+        found = analysis.hits('medical_acronym')
+        return any(
+            acronym.lower() in found and re.search(rf'\b{acronym}\b', analysis.text)
+            for acronym in self.MEDICAL_ACRONYMS
+        )
+    
+    def redact(self, text: str, analysis: Optional[TextAnalysis] = None) -> Tuple[str, List[str]]:
         """
         Redact PII from text
         
         Args:
             text: Input text to redact
+            analysis: Shared scan of text, if the caller already has one
             
         Returns:
             Tuple of (redacted_text, list_of_pii_types_found)
         """
-        redacted_text = text
-        pii_types = []
-        
-        # Redact SSN (show last 4 digits)
-        def redact_ssn(match):
-            pii_types.append('SSN')
-            ssn = match.group()
-            last_four = ssn[-4:]
-            return f"[REDACTED-SSN-{last_four}]"
-        
-        redacted_text = re.sub(
-            self.SSN_PATTERN,
-            redact_ssn,
-            redacted_text
-        )
+        if analysis is None:
+            analysis = self.analyzer.analyze(text)
         
-        # Redact credit cards (show last 4)
-        def redact_cc(match):
-            pii_types.append('CREDIT_CARD')
-            cc = match.group().replace('-', '').replace(' ', '')
-            last_four = cc[-4:]
-            return f"[REDACTED-CC-{last_four}]"
+        start = time.perf_counter()
+        parts = []
+        position = 0
+        for span_start, span_end, pii_type in analysis.pii_spans:
+            parts.append(text[position:span_start])
+            parts.append(self._replacement(pii_type, text[span_start:span_end]))
+            position = span_end
+        parts.append(text[position:])
+        redacted_text = ''.join(parts)
         
-        redacted_text = re.sub(
-            self.CREDIT_CARD_PATTERN,
-            redact_cc,
-            redacted_text
-        )
-        
-        # Redact phone numbers
-        if re.search(self.PHONE_PATTERN, redacted_text):
-            pii_types.append('PHONE')
-            redacted_text = re.sub(
-                self.PHONE_PATTERN,
-                '[REDACTED-PHONE]',
-                redacted_text
-            )
-        
-        # Redact emails (keep domain for context)
-        def redact_email(match):
-            pii_types.append('EMAIL')
-            email = match.group()
-            domain = email.split('@')[1] if '@' in email else ''
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage="pii_redact")
+        return redacted_text, self.detect_pii_types(text, analysis)
+    
+    @staticmethod
+    def _replacement(pii_type: str, value: str) -> str:
+        """Redaction marker for one PII match"""
+        if pii_type == 'SSN':
+            # Show last 4 digits
+            return f"[REDACTED-SSN-{value[-4:]}]"
+        if pii_type == 'CREDIT_CARD':
+            # Show last 4 digits
+            digits = value.replace('-', '').replace(' ', '')
+            return f"[REDACTED-CC-{digits[-4:]}]"
+        if pii_type == 'EMAIL':
+            # Keep domain for context
+            domain = value.split('@')[1] if '@' in value else ''
             return f"[REDACTED-EMAIL]@{domain}" if domain else "[REDACTED-EMAIL]"
-        
-        redacted_text = re.sub(
-            self.EMAIL_PATTERN,
-            redact_email,
-            redacted_text
-        )
-        
-        # Redact salary amounts
-        if re.search(self.SALARY_PATTERN, redacted_text):
-            pii_types.append('SALARY')
-            redacted_text = re.sub(
-                self.SALARY_PATTERN,
-                '[REDACTED-SALARY]',
-                redacted_text
-            )
-        
-        # Flag medical information (don't fully redact, just mark)
-        text_lower = redacted_text.lower()
-        for term in self.MEDICAL_TERMS:
-            if term in text_lower:
-                pii_types.append('MEDICAL_INFO')
-                break
-        
-        return redacted_text, list(set(pii_types))
+        return f"[REDACTED-{pii_type}]"
     
     def has_pii(self, text: str) -> bool:
         """Check if text contains any PII"""
@@ -0,0 +1,73 @@
+"""
+Single-flight request coalescing
+Concurrent async calls with the same key share one upstream execution
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; later callers wait for its result"""
+
+    def __init__(self, timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            timeout: Seconds a follower waits on the leader before giving up.
+                A leader older than this no longer absorbs new callers.
+            clock: Monotonic time source (injectable for testing)
+        """
+        self.timeout = timeout
+        self._clock = clock
+        # key -> (started_at, future shared with followers)
+        self._inflight: Dict[Hashable, Tuple[float, asyncio.Future]] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run fn() unless an identical call is already in flight
+
+        Must be called from the event loop thread.
+
+        Returns:
+            (result, shared) where shared is True if another caller's
+            result was reused
+
+        Raises:
+            asyncio.TimeoutError: a follower waited longer than timeout
+        """
+        inflight = self._inflight.get(key)
+        if inflight is not None and self._clock() - inflight[0] < self.timeout:
+            self.followers += 1
+            started_at, future = inflight
+            remaining = self.timeout - (self._clock() - started_at)
+            # shield: a follower timing out must not cancel the leader
+            return await asyncio.wait_for(asyncio.shield(future), remaining), True
+
+        self.leaders += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = (self._clock(), future)
+        try:
+            result = await fn()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                # Futures can't carry a CancelledError; followers see a plain error
+                e = RuntimeError("single-flight leader was cancelled")
+            future.set_exception(e)
+            # Mark retrieved so lone leaders don't log "exception never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            if self._inflight.get(key, (None, None))[1] is future:
+                del self._inflight[key]
+
+    def stats(self):
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "followers": self.followers,
+        }
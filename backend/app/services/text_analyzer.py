@@ -0,0 +1,154 @@
+"""
+Shared ticket text analysis
+Scans a description once for PII spans and tagged lexicon phrases
+"""
+import re
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.services.metrics import STAGE_LATENCY
+from app.services.phrase_matcher import PhraseMatcher, tokenize
+
+
+class TextAnalysis:
+    """
+    Result of scanning one description
+
+    Consumed by PII redaction, classification and resolution so none of
+    them has to rescan the text.
+    """
+
+    __slots__ = ("text", "words", "pii_spans", "_hits")
+
+    def __init__(self, text: str, words: List[str], pii_spans: List[Tuple[int, int, str]], hits: Dict[str, Set[str]]):
+        self.text = text
+        # lowercased word tokens
+        self.words = words
+        # (start, end, pii_type) in text order, non-overlapping
+        self.pii_spans = pii_spans
+        self._hits = hits
+
+    def hits(self, tag: str) -> Set[str]:
+        """Phrases from the lexicon registered under tag that occur in the text"""
+        return self._hits.get(tag, set())
+
+    @property
+    def pii_types(self) -> List[str]:
+        return sorted({pii_type for _, _, pii_type in self.pii_spans})
+
+
+class TextAnalyzer:
+    """
+    Shared scanner for PII patterns and tagged phrase lexicons
+
+    PII matches are taken leftmost first without overlaps; where patterns
+    could overlap, the earlier pattern in pii_patterns wins. All lexicons
+    share one PhraseMatcher, so the text is tokenized and matched once
+    however many are registered.
+    """
+
+    def __init__(
+        self,
+        pii_patterns: Optional[Dict[str, str]] = None,
+        lexicons: Optional[Dict[str, Iterable[str]]] = None,
+        folding: Optional[Dict[str, Callable[[str], str]]] = None,
+    ):
+        """
+        Args:
+            pii_patterns: PII type -> regex, in priority order
+            lexicons: tag -> phrases (whole-word, case-insensitive)
+            folding: tag -> token fold; that lexicon's phrase words also match
+                text words with the same fold (e.g. fold_plural), expanded
+                when compiled; tags not listed match exact words
+        """
+        self.pii_patterns = dict(pii_patterns or {})
+        self.lexicons = {tag: list(phrases) for tag, phrases in (lexicons or {}).items()}
+        self.folding = dict(folding or {})
+
+        # Compiled one by one: a single alternation defeats the regex
+        # engine's prefix scans and is slower than searching each pattern
+        self._pii_regexes = [
+            (pii_type, re.compile(pattern)) for pii_type, pattern in self.pii_patterns.items()
+        ]
+
+        # normalized phrase -> fold -> tags it was registered under
+        entries: Dict[str, Dict[Optional[Callable[[str], str]], Set[str]]] = {}
+        for tag, phrases in self.lexicons.items():
+            fold = self.folding.get(tag)
+            for phrase in phrases:
+                entries.setdefault(phrase.strip().lower(), {}).setdefault(fold, set()).add(tag)
+
+        # One matcher covers every lexicon; only a phrase listed under tags
+        # with different folds needs a further matcher per extra fold
+        layers: List[Dict[str, Tuple[Optional[Callable[[str], str]], Set[str]]]] = []
+        for phrase, by_fold in entries.items():
+            for depth, (fold, tags) in enumerate(by_fold.items()):
+                if depth == len(layers):
+                    layers.append({})
+                layers[depth][phrase] = (fold, tags)
+        self._matchers = [
+            (
+                PhraseMatcher(layer, fold={phrase: fold for phrase, (fold, _) in layer.items()}),
+                {phrase: tags for phrase, (_, tags) in layer.items()},
+            )
+            for layer in layers
+        ]
+
+    @classmethod
+    def combine(cls, *analyzers: "TextAnalyzer") -> "TextAnalyzer":
+        """One analyzer covering the patterns and lexicons of several"""
+        pii_patterns: Dict[str, str] = {}
+        lexicons: Dict[str, List[str]] = {}
+        folding: Dict[str, Callable[[str], str]] = {}
+        for analyzer in analyzers:
+            pii_patterns.update(analyzer.pii_patterns)
+            folding.update(analyzer.folding)
+            for tag, phrases in analyzer.lexicons.items():
+                lexicons.setdefault(tag, []).extend(phrases)
+        return cls(pii_patterns, lexicons, folding)
+
+    def analyze(self, text: str) -> TextAnalysis:
+        """Scan text once for PII spans and lexicon hits"""
+        start = time.perf_counter()
+
+        pii_spans = self._pii_spans(text)
+        words = tokenize(text)
+        word_set = set(words)
+        hits: Dict[str, Set[str]] = {}
+        for matcher, phrase_tags in self._matchers:
+            for phrase in matcher.matched_words(words, word_set):
+                for tag in phrase_tags[phrase]:
+                    hits.setdefault(tag, set()).add(phrase)
+
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage="analyze")
+        return TextAnalysis(text, words, pii_spans, hits)
+
+    def _pii_spans(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        Non-overlapping PII matches, leftmost first, the earlier pattern
+        winning at the same position (as one alternation would scan them)
+        """
+        # Next match of each pattern at or after the scan position
+        pending = []
+        for priority, (pii_type, regex) in enumerate(self._pii_regexes):
+            match = regex.search(text)
+            if match:
+                pending.append((match.start(), priority, match, pii_type, regex))
+
+        spans = []
+        while pending:
+            start, _, match, pii_type, regex = min(pending, key=lambda entry: entry[:2])
+            end = match.end()
+            spans.append((start, end, pii_type))
+            # Patterns whose next match overlaps this one search again from its end
+            position = end if end > start else end + 1
+            advanced = []
+            for entry in pending:
+                if entry[0] >= position:
+                    advanced.append(entry)
+                    continue
+                match = entry[4].search(text, position)
+                if match:
+                    advanced.append((match.start(), entry[1], match, entry[3], entry[4]))
+            pending = advanced
+        return spans
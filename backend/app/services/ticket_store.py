@@ -0,0 +1,276 @@
+"""
+In-memory ticket store
+Indexes tickets by id, status, category and department for fast queue reads
+and keeps running analytics aggregates
+"""
+import bisect
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Sort key for a ticket: (created_at, id)
+TicketKey = Tuple[str, int]
+
+
+class TicketAggregates:
+    """Running ticket counts for the analytics dashboard"""
+
+    URGENCY_LEVELS = ("Low", "Medium", "High", "Critical")
+
+    # Ticket fields the aggregates depend on
+    FIELDS = ("category", "department", "urgency", "status")
+
+    def __init__(self):
+        self.category = Counter()
+        self.department = Counter()
+        self.urgency = Counter()
+        self.status = Counter()
+        self.daily = Counter()
+        self.total = 0
+
+    @classmethod
+    def from_tickets(cls, tickets: Iterable[Dict]) -> "TicketAggregates":
+        """Full recompute over a ticket collection"""
+        aggregates = cls()
+        for ticket in tickets:
+            aggregates.add(ticket)
+        return aggregates
+
+    def _apply(self, ticket: Dict, delta: int):
+        self.category[ticket["category"]] += delta
+        self.department[ticket["department"]] += delta
+        self.urgency[ticket["urgency"]] += delta
+        self.status[ticket["status"]] += delta
+        self.daily[ticket["created_at"].split("T")[0]] += delta
+        self.total += delta
+
+    def add(self, ticket: Dict):
+        """Count a ticket"""
+        self._apply(ticket, 1)
+
+    def remove(self, ticket: Dict):
+        """Uncount a ticket, e.g. before its fields change"""
+        self._apply(ticket, -1)
+
+    @staticmethod
+    def _nonzero(counter: Counter) -> Dict[str, int]:
+        return {key: count for key, count in counter.items() if count}
+
+    def snapshot(self) -> Dict:
+        """Current aggregates in the /api/analytics/metrics shape"""
+        urgency = {level: 0 for level in self.URGENCY_LEVELS}
+        urgency.update(self._nonzero(self.urgency))
+        return {
+            "category_breakdown": self._nonzero(self.category),
+            "department_breakdown": self._nonzero(self.department),
+            "status_breakdown": self._nonzero(self.status),
+            "urgency_distribution": urgency,
+            "daily_volume": self._nonzero(self.daily),
+            "total_tickets": self.total,
+        }
+
+
+class TicketStore:
+    """Ticket storage with O(1) id lookup and created_at-ordered secondary indexes"""
+
+    INDEXED_FIELDS = ("status", "category", "department")
+
+    def __init__(self, tickets: Optional[List[Dict]] = None):
+        """Initialize store, optionally bulk-loading existing tickets"""
+        self._tickets: Dict[int, Dict] = {}
+        # All ticket keys in ascending created_at order
+        self._order: List[TicketKey] = []
+        # field -> value -> ticket keys in ascending created_at order
+        self._indexes: Dict[str, Dict[str, List[TicketKey]]] = {
+            field: {} for field in self.INDEXED_FIELDS
+        }
+        self._max_id = 0
+        self._lock = threading.RLock()
+        self.aggregates = TicketAggregates()
+        # Bumped on every mutation; used for ETags and change detection
+        self.version = 0
+
+        if tickets:
+            self.load(tickets)
+
+    def load(self, tickets: List[Dict]):
+        """Bulk-load tickets, sorting once instead of inserting one by one"""
+        with self._lock:
+            for ticket in tickets:
+                self._tickets[ticket["id"]] = ticket
+                self._max_id = max(self._max_id, ticket["id"])
+
+            self._order = sorted(self.key_of(t) for t in self._tickets.values())
+            self._indexes = {field: {} for field in self.INDEXED_FIELDS}
+            for key in self._order:
+                ticket = self._tickets[key[1]]
+                for field in self.INDEXED_FIELDS:
+                    self._indexes[field].setdefault(ticket.get(field), []).append(key)
+
+            self.aggregates = TicketAggregates.from_tickets(self._tickets.values())
+            self.version += 1
+
+    def add(self, ticket: Dict) -> Dict:
+        """
+        Add a new ticket to the store
+
+        Args:
+            ticket: Ticket dict with at least id and created_at
+
+        Returns:
+            The stored ticket
+        """
+        with self._lock:
+            if ticket["id"] in self._tickets:
+                raise ValueError(f"Ticket {ticket['id']} already exists")
+
+            key = self.key_of(ticket)
+            self._tickets[ticket["id"]] = ticket
+            self._max_id = max(self._max_id, ticket["id"])
+            bisect.insort(self._order, key)
+            for field in self.INDEXED_FIELDS:
+                bisect.insort(self._indexes[field].setdefault(ticket.get(field), []), key)
+            self.aggregates.add(ticket)
+            self.version += 1
+
+        return ticket
+
+    def get(self, ticket_id: int) -> Optional[Dict]:
+        """Get ticket by id, or None if it does not exist"""
+        return self._tickets.get(ticket_id)
+
+    def update(self, ticket_id: int, changes: Dict) -> Optional[Dict]:
+        """
+        Apply changes to a ticket and keep secondary indexes in sync
+
+        Indexed fields must only be changed through this method. The sort
+        key fields (id, created_at) are immutable.
+
+        Args:
+            ticket_id: Ticket to update
+            changes: Field values to set
+
+        Returns:
+            The updated ticket, or None if it does not exist
+        """
+        if "id" in changes or "created_at" in changes:
+            raise ValueError("id and created_at cannot be changed")
+
+        with self._lock:
+            ticket = self._tickets.get(ticket_id)
+            if ticket is None:
+                return None
+
+            key = self.key_of(ticket)
+            for field in self.INDEXED_FIELDS:
+                if field in changes and changes[field] != ticket.get(field):
+                    self._remove_from_index(field, ticket.get(field), key)
+                    bisect.insort(self._indexes[field].setdefault(changes[field], []), key)
+
+            recount = any(
+                field in changes and changes[field] != ticket.get(field)
+                for field in TicketAggregates.FIELDS
+            )
+            if recount:
+                self.aggregates.remove(ticket)
+            ticket.update(changes)
+            if recount:
+                self.aggregates.add(ticket)
+            self.version += 1
+
+        return ticket
+
+    def _remove_from_index(self, field: str, value, key: TicketKey):
+        keys = self._indexes[field].get(value)
+        if not keys:
+            return
+        pos = bisect.bisect_left(keys, key)
+        if pos < len(keys) and keys[pos] == key:
+            del keys[pos]
+        if not keys:
+            del self._indexes[field][value]
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        category: Optional[str] = None,
+        department: Optional[str] = None,
+        limit: int = 50,
+        before: Optional[TicketKey] = None,
+    ) -> List[Dict]:
+        """
+        Get the newest tickets matching all given filters
+
+        Walks the smallest matching index from newest to oldest, so no sort is
+        needed and work stops as soon as `limit` tickets are found.
+
+        Args:
+            before: Only return tickets whose (created_at, id) key sorts
+                strictly before this one (keyset pagination)
+
+        Returns:
+            Tickets ordered by created_at descending
+        """
+        filters = {
+            field: value
+            for field, value in (("status", status), ("category", category), ("department", department))
+            if value
+        }
+
+        with self._lock:
+            candidates = self._order
+            for field, value in filters.items():
+                keys = self._indexes[field].get(value, [])
+                if len(keys) < len(candidates):
+                    candidates = keys
+
+            end = len(candidates) if before is None else bisect.bisect_left(candidates, before)
+
+            results = []
+            for pos in range(end - 1, -1, -1):
+                if len(results) >= limit:
+                    break
+                ticket = self._tickets[candidates[pos][1]]
+                if all(ticket.get(field) == value for field, value in filters.items()):
+                    results.append(ticket)
+
+        return results
+
+    def analytics(self) -> Dict:
+        """Current running aggregates, independent of ticket count"""
+        with self._lock:
+            return self.aggregates.snapshot()
+
+    def check_aggregates(self) -> List[str]:
+        """
+        Compare running aggregates against a full recompute
+
+        Returns:
+            Names of aggregates that disagree (empty when consistent)
+        """
+        with self._lock:
+            expected = TicketAggregates.from_tickets(self._tickets.values()).snapshot()
+            actual = self.aggregates.snapshot()
+
+        return [name for name in expected if expected[name] != actual[name]]
+
+    @staticmethod
+    def key_of(ticket: Dict) -> TicketKey:
+        """Pagination key of a ticket"""
+        return (ticket["created_at"], ticket["id"])
+
+    def reserve_id(self) -> int:
+        """Allocate a ticket id that no stored or in-flight ticket uses"""
+        with self._lock:
+            self._max_id += 1
+            return self._max_id
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def __contains__(self, ticket_id: int) -> bool:
+        return ticket_id in self._tickets
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Iterate tickets in created_at order"""
+        return (self._tickets[ticket_id] for _, ticket_id in list(self._order))
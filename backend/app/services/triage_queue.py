@@ -0,0 +1,103 @@
+"""
+Background triage queue
+Runs the PII/classification/resolution pipeline on in-process async workers
+"""
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class TriageQueue:
+    """Bounded in-process job queue with a fixed pool of async workers"""
+
+    # Failed jobs kept around for status polling
+    MAX_FAILED_JOBS = 1000
+
+    def __init__(
+        self,
+        handler: Callable[[int, Any], Awaitable[None]],
+        workers: int = 4,
+        max_pending: int = 1000,
+    ):
+        """
+        Args:
+            handler: Coroutine run for each job as handler(job_id, payload)
+            workers: Number of concurrent worker tasks
+            max_pending: Queue capacity; submit() refuses jobs beyond this
+        """
+        self.handler = handler
+        self.workers = workers
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # job_id -> job state, for queued and running jobs
+        self._jobs: Dict[int, Dict] = {}
+        # Most recent failures, oldest first
+        self._failed: "OrderedDict[int, Dict]" = OrderedDict()
+
+    async def start(self):
+        """Start worker tasks on the running event loop"""
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"triage-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        """Cancel worker tasks; queued jobs are dropped"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job_id: int, payload: Any) -> bool:
+        """
+        Enqueue a job without waiting
+
+        Returns:
+            False if the queue is full (caller should shed load)
+        """
+        if self._queue is None:
+            raise RuntimeError("TriageQueue has not been started")
+
+        try:
+            self._queue.put_nowait((job_id, payload))
+        except asyncio.QueueFull:
+            return False
+
+        self._jobs[job_id] = {
+            "state": "queued",
+            "submitted_at": datetime.now().isoformat(),
+        }
+        return True
+
+    def status(self, job_id: int) -> Optional[Dict]:
+        """State of a queued, running or failed job, or None if unknown/completed"""
+        return self._jobs.get(job_id) or self._failed.get(job_id)
+
+    def stats(self) -> Dict:
+        """Queue depth and worker count for health output"""
+        return {
+            "workers": len(self._tasks),
+            "pending": self._queue.qsize() if self._queue else 0,
+            "capacity": self.max_pending,
+        }
+
+    async def _worker(self):
+        while True:
+            job_id, payload = await self._queue.get()
+            job = self._jobs[job_id]
+            job["state"] = "running"
+            try:
+                await self.handler(job_id, payload)
+            except Exception as e:
+                print(f"❌ Triage job {job_id} failed: {e}")
+                job["state"] = "failed"
+                job["error"] = str(e)
+                self._failed[job_id] = job
+                if len(self._failed) > self.MAX_FAILED_JOBS:
+                    self._failed.popitem(last=False)
+            finally:
+                del self._jobs[job_id]
+                self._queue.task_done()
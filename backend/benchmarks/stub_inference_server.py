@@ -0,0 +1,112 @@
+"""
+Stub HuggingFace text-generation server for exercising the inference client
+Run from backend/: python -m benchmarks.stub_inference_server [port]
+"""
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Behaviour knobs; POST a JSON object to /control to change them at runtime,
+# e.g. {"status": 503} to simulate an outage or {"latency": 12} for slow calls
+SETTINGS = {
+    "latency": 0.05,    # seconds before answering
+    "status": 200,      # HTTP status to return
+    "fail_rate": 0.0,   # fraction of calls answered with 500 regardless of status
+    "max_concurrent": 0,  # answer 429 above this many in-flight calls (0 = no limit)
+    "category": "General HR Inquiries",
+    "confidence": 90,
+    "token_delay": 0.01,  # seconds between streamed tokens
+    "output": None,     # raw completion text to send instead of the JSON answer
+}
+
+# Models tend to keep talking after the JSON; streamed clients can stop early
+TRAILER = (
+    "\n```\n\nThe employee is asking a general question that does not fit a more "
+    "specific category, so it is routed to the HR generalist queue for follow-up. "
+) * 3
+CALLS = {"count": 0, "in_flight": 0, "rate_limited": 0, "tokens_sent": 0}
+_lock = threading.Lock()
+
+
+def completion() -> str:
+    if SETTINGS["output"] is not None:
+        return SETTINGS["output"]
+    return "```json\n" + json.dumps({
+        "category": SETTINGS["category"],
+        "confidence": SETTINGS["confidence"],
+        "urgency": "Low",
+        "reasoning": "stub response",
+    }) + TRAILER
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; don't let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/control":
+            with _lock:
+                SETTINGS.update(json.loads(body or b"{}"))
+            return self._send(200, {"settings": SETTINGS, "calls": CALLS})
+
+        with _lock:
+            CALLS["count"] += 1
+            limit = SETTINGS["max_concurrent"]
+            if limit and CALLS["in_flight"] >= limit:
+                CALLS["rate_limited"] += 1
+                return self._send(429, {"error": "rate limited"})
+            CALLS["in_flight"] += 1
+        try:
+            time.sleep(SETTINGS["latency"])
+        finally:
+            with _lock:
+                CALLS["in_flight"] -= 1
+        status = 500 if random.random() < SETTINGS["fail_rate"] else SETTINGS["status"]
+        if status != 200:
+            return self._send(status, {"error": "stub failure"})
+        if json.loads(body or b"{}").get("stream"):
+            return self._stream(completion())
+        self._send(200, [{"generated_text": completion()}])
+
+    def _stream(self, text: str):
+        """Text-generation-inference style SSE: one token event per ~4 characters"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        sent = 0
+        try:
+            for i in range(0, len(text), 4):
+                event = {"token": {"id": i, "text": text[i:i + 4], "special": False}}
+                self.wfile.write(f"data:{json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+                sent += 1
+                time.sleep(SETTINGS["token_delay"])
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        with _lock:
+            CALLS["tokens_sent"] += sent
+
+    def _send(self, status: int, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 9000
+    print(f"Stub inference server on http://127.0.0.1:{port}/models")
+    print(f"Use HF_INFERENCE_URL=http://127.0.0.1:{port}/models HUGGINGFACE_TOKEN=stub")
+    ThreadingHTTPServer(("127.0.0.1", port), StubHandler).serve_forever()
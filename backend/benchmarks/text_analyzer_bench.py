@@ -0,0 +1,86 @@
+"""
+Benchmark: one shared TextAnalyzer scan vs. the separate per-stage passes
+Run from backend/: python -m benchmarks.text_analyzer_bench
+"""
+import random
+import re
+import timeit
+
+from app.services.ai_service import AIService
+from app.services.phrase_matcher import PhraseMatcher, fold_inflections
+from app.services.pii_detector import PIIDetector
+from app.services.text_analyzer import TextAnalyzer
+from benchmarks.keyword_matcher_bench import legacy_classify, make_description
+
+PII_SAMPLES = [
+    "john.doe@example.com", "555-123-4567", "123-45-6789", "$85,000",
+    "4111 1111 1111 1111", "my diabetes",
+]
+
+# The pre-analyzer patterns, each run as its own substitution pass
+LEGACY_PATTERNS = [
+    ("SSN", r'\b\d{3}-\d{2}-\d{4}\b'),
+    ("CREDIT_CARD", r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b'),
+    ("PHONE", r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'),
+    ("EMAIL", r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),
+    ("SALARY", r'\$\s?\d{1,3}(,\d{3})*(\.\d{2})?'),
+]
+
+
+def legacy_redact(text: str) -> tuple:
+    """The multi-pass implementation: one regex substitution per PII type"""
+    pii_types = set()
+
+    def replace(pii_type):
+        def marker(match):
+            pii_types.add(pii_type)
+            return PIIDetector._replacement(pii_type, match.group())
+        return marker
+
+    for pii_type, pattern in LEGACY_PATTERNS:
+        text = re.sub(pattern, replace(pii_type), text)
+    text_lower = text.lower()
+    if any(term.lower() in text_lower for term in PIIDetector.MEDICAL_TERMS):
+        pii_types.add("MEDICAL_INFO")
+    return text, sorted(pii_types)
+
+
+def make_ticket(length: int, seed: int, with_pii: bool) -> str:
+    rng = random.Random(seed)
+    words = make_description(length, seed).split()
+    for _ in range(max(1, length // 150) if with_pii else 0):
+        words.insert(rng.randrange(len(words)), rng.choice(PII_SAMPLES))
+    return " ".join(words)[:length]
+
+
+if __name__ == "__main__":
+    service = AIService()
+    detector = PIIDetector()
+    analyzer = TextAnalyzer.combine(detector.analyzer, service.analyzer)
+    sensitive = PhraseMatcher(service._load_sensitive_lexicon(), fold=fold_inflections)
+
+    def separate(description):
+        legacy_redact(description)
+        sensitive.matched(description)
+        legacy_classify(description)
+
+    def shared(description):
+        analysis = analyzer.analyze(description)
+        detector.redact(description, analysis)
+        analysis.hits("sensitive")
+        service._classify_with_keywords(analysis)
+
+    print(f"{'length':>8} {'PII':>5} {'separate µs':>12} {'shared µs':>12} {'speed-up':>9}")
+    for with_pii in (True, False):
+        for length in (100, 500, 2000):
+            descriptions = [make_ticket(length, seed, with_pii) for seed in range(50)]
+            runs = max(20, 20000 // length)
+            per_call = runs * len(descriptions)
+
+            def best(pipeline):
+                return min(timeit.repeat(
+                    lambda: [pipeline(d) for d in descriptions], number=runs, repeat=5
+                )) / per_call * 1e6
+
+            before, after = best(separate), best(shared)
+            print(f"{length:>8} {'yes' if with_pii else 'no':>5} {before:>12.1f} {after:>12.1f} {before / after:>8.2f}x")
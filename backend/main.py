@@ -2,17 +2,29 @@
 FastAPI Backend for HR Ticket Triage System
 Handles ticket submission, AI classification, PII detection, and analytics
 """
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, validator
+from typing import AsyncIterator, Dict, List, Optional
 from datetime import datetime
+import asyncio
+import base64
+import csv
+import io
 import json
 import os
+import uuid
 
 from app.services.ai_service import AIService
+from app.services.knowledge_index import snippet
 from app.services.pii_detector import PIIDetector
+from app.services.text_analyzer import TextAnalysis, TextAnalyzer
+from app.services.ticket_store import TicketStore
+from app.services.triage_queue import TriageQueue
+from app.services.event_broker import EventBroker
+from app.services.metrics import METRICS
+from app.services.phrase_matcher import tokenize
 
 app = FastAPI(
     title="HR Ticket Triage API",
@@ -29,18 +41,52 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+# Bulk submission limits
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+# Largest accepted ticket in a bulk body; bounds how much is read before a 413
+BULK_MAX_ITEM_BYTES = int(os.getenv("BULK_MAX_ITEM_BYTES", "8192"))
+
+# Tickets read from the store per step of a streaming export
+EXPORT_PAGE_SIZE = 500
+
+# Column order for CSV exports
+EXPORT_CSV_FIELDS = [
+    "id", "created_at", "employee_name", "department", "category", "urgency",
+    "status", "confidence", "auto_resolved", "resolved_at", "sensitive",
+    "description",
+]
+
+# Background triage workers (async submission mode)
+TRIAGE_WORKERS = int(os.getenv("TRIAGE_WORKERS", "4"))
+TRIAGE_MAX_PENDING = int(os.getenv("TRIAGE_MAX_PENDING", "1000"))
+
+# Seconds between checks for edited knowledge base files (0 = no hot reload)
+KB_RELOAD_INTERVAL = float(os.getenv("KB_RELOAD_INTERVAL", "5"))
+
+# Server-Sent Events feed
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_HEARTBEAT_SECONDS = 15
+
 # Initialize services
 ai_service = AIService()
 pii_detector = PIIDetector()
+# One scan per description, shared by redaction, classification and resolution
+text_analyzer = TextAnalyzer.combine(pii_detector.analyzer, ai_service.analyzer)
+event_broker = EventBroker(max_queue=SSE_QUEUE_SIZE)
 
 # Load mock data
 with open("app/services/mock_data.json", "r") as f:
     mock_data = json.load(f)
-    TICKETS = mock_data["tickets"]
+    TICKETS = TicketStore(mock_data["tickets"])
     ANALYTICS = mock_data["analytics"]
 
+# Distinguishes store versions across restarts so stale ETags never match
+ETAG_EPOCH = uuid.uuid4().hex[:8]
+
 # Pydantic Models
 class TicketSubmission(BaseModel):
     employee_name: str = Field(..., min_length=2, max_length=100)
@@ -75,45 +121,25 @@ class FeedbackSubmission(BaseModel):
     helpful: bool
     comment: Optional[str] = None
 
-# API Endpoints
-
-@app.get("/")
-async def root():
-    """API health check"""
-    return {
-        "status": "operational",
-        "version": "2.3.1",
-        "ai_status": "connected" if ai_service.use_ai else "mock_mode",
-    }
-
-@app.get("/api/health")
-async def health():
-    """System health check"""
-    return {
-        "status": "operational",
-        "timestamp": datetime.now().isoformat(),
-        "services": {
-            "api": "operational",
-            "ai": "connected" if ai_service.use_ai else "mock",
-            "pii_detector": "operational",
-        }
-    }
+# Ticket pipeline
 
-@app.post("/api/tickets/submit", response_model=TicketResponse)
-async def submit_ticket(submission: TicketSubmission):
+def create_ticket(
+    submission: TicketSubmission,
+    redacted_description: str,
+    pii_types: List[str],
+    classification: dict,
+    ticket_id: Optional[int] = None,
+    analysis: Optional[TextAnalysis] = None,
+    submitted_at: Optional[str] = None,
+) -> dict:
     """
-    Submit a new HR ticket
-    - Detects PII and redacts
-    - Classifies with AI
-    - Attempts auto-resolution
-    - Escalates if needed
-    """
-    # Detect and redact PII
-    redacted_description, pii_types = pii_detector.redact(submission.description)
-    
-    # Classify ticket
-    classification = ai_service.classify_ticket(submission.description)
+    Attempt auto-resolution, determine status and store a new ticket
     
+    Shared by single, bulk and background submission once PII redaction
+    and classification have run. analysis is the shared scan of the
+    description those stages used; submitted_at is when an async
+    submission was queued.
+    """
     # Check if sensitive
     is_sensitive = classification.get("sensitive", False)
     
@@ -124,7 +150,8 @@ async def submit_ticket(submission: TicketSubmission):
     if classification["confidence"] >= 85 and not is_sensitive:
         resolution = ai_service.auto_resolve(
             submission.description, 
-            classification["category"]
+            classification["category"],
+            analysis=analysis,
         )
         if resolution:
             auto_resolved = True
@@ -141,7 +168,7 @@ async def submit_ticket(submission: TicketSubmission):
     
     # Create ticket
     ticket = {
-        "id": len(TICKETS) + 1,
+        "id": ticket_id or TICKETS.reserve_id(),
         "employee_name": submission.employee_name,
         "department": submission.department,
         "category": classification["category"],
@@ -158,137 +185,645 @@ async def submit_ticket(submission: TicketSubmission):
         "sensitive": is_sensitive,
         "reasoning": classification.get("reasoning", ""),
     }
+    if submitted_at:
+        ticket["submitted_at"] = submitted_at
     
     # Add to mock database
-    TICKETS.append(ticket)
+    TICKETS.add(ticket)
+    event_broker.publish("ticket_created", ticket)
     
     return ticket
 
+async def run_triage(ticket_id: int, submission: TicketSubmission):
+    """Full triage pipeline for a ticket submitted in async mode"""
+    analysis = text_analyzer.analyze(submission.description)
+    redacted_description, pii_types = pii_detector.redact(submission.description, analysis)
+    classification = await ai_service.classify_ticket_async(submission.description, analysis)
+    job = triage_queue.status(ticket_id)
+    create_ticket(
+        submission, redacted_description, pii_types, classification,
+        ticket_id=ticket_id, analysis=analysis,
+        submitted_at=job["submitted_at"] if job else None,
+    )
+
+triage_queue = TriageQueue(run_triage, workers=TRIAGE_WORKERS, max_pending=TRIAGE_MAX_PENDING)
+
+async def watch_knowledge_base():
+    """Reload edited knowledge base files; indexing runs off the event loop"""
+    while True:
+        await asyncio.sleep(KB_RELOAD_INTERVAL)
+        try:
+            await asyncio.to_thread(ai_service.reload_knowledge_base)
+        except Exception as e:
+            print(f"Knowledge base reload failed: {e}")
+
+kb_watcher: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_services():
+    """Start background workers"""
+    global kb_watcher
+    await triage_queue.start()
+    if KB_RELOAD_INTERVAL > 0:
+        kb_watcher = asyncio.create_task(watch_knowledge_base(), name="kb-watcher")
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    """Release service resources"""
+    if kb_watcher:
+        kb_watcher.cancel()
+    await triage_queue.stop()
+    ai_service.close()
+
+# API Endpoints
+
+@app.get("/")
+async def root():
+    """API health check"""
+    return {
+        "status": "operational",
+        "version": "2.3.1",
+        "ai_status": "connected" if ai_service.use_ai else "mock_mode",
+    }
+
+@app.get("/api/health")
+async def health():
+    """System health check"""
+    return {
+        "status": "operational",
+        "timestamp": datetime.now().isoformat(),
+        "services": {
+            "api": "operational",
+            "ai": "connected" if ai_service.use_ai else "mock",
+            "classifier": ai_service.classifier_mode,
+            "pii_detector": "operational",
+        },
+        "classification_cache": ai_service.classification_cache.stats(),
+        "classifier_cascade": ai_service.cascade_stats(),
+        "coalescing": ai_service.single_flight.stats(),
+        "circuit_breaker": ai_service.circuit_breaker.stats(),
+        "ai_limiter": ai_service.limiter.stats(),
+        "knowledge_base": ai_service.knowledge_base.stats(),
+        "triage_queue": triage_queue.stats(),
+        "event_subscribers": event_broker.subscriber_count,
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: per-stage latency histograms and inference counters"""
+    return PlainTextResponse(
+        METRICS.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+@app.post("/api/tickets/submit", response_model=TicketResponse)
+async def submit_ticket(submission: TicketSubmission, mode: Optional[str] = None):
+    """
+    Submit a new HR ticket
+    - Detects PII and redacts
+    - Classifies with AI
+    - Attempts auto-resolution
+    - Escalates if needed
+    
+    With mode=async the pipeline runs on background workers: the response
+    is 202 with the ticket id and a Pending status, and the outcome is
+    polled from /api/tickets/{id}/status.
+    """
+    if mode == "async":
+        ticket_id = TICKETS.reserve_id()
+        if not triage_queue.submit(ticket_id, submission):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Triage queue is full, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        status_url = f"/api/tickets/{ticket_id}/status"
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"id": ticket_id, "status": "Pending", "status_url": status_url},
+            headers={"Location": status_url},
+        )
+    elif mode is not None:
+        raise HTTPException(status_code=400, detail="mode must be 'async' if given")
+    
+    # Scan the description once for every stage below
+    analysis = text_analyzer.analyze(submission.description)
+    
+    # Detect and redact PII
+    redacted_description, pii_types = pii_detector.redact(submission.description, analysis)
+    
+    # Classify ticket (inference runs off the event loop)
+    classification = await ai_service.classify_ticket_async(submission.description, analysis)
+    
+    # Resolve, build and store the ticket
+    return create_ticket(
+        submission, redacted_description, pii_types, classification, analysis=analysis
+    )
+
+def _too_many_items() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Too many tickets (max {BULK_MAX_ITEMS})")
+
+async def _ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[bytes]]:
+    """
+    Lines of a streamed NDJSON body, without buffering the whole body
+
+    A line longer than BULK_MAX_ITEM_BYTES is yielded as None and the
+    rest of it is skipped rather than held in memory.
+    """
+    buffer = b""
+    oversized = False
+    async for chunk in chunks:
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            yield None if oversized else line
+            oversized = False
+        if len(buffer) > BULK_MAX_ITEM_BYTES:
+            buffer, oversized = b"", True
+    if buffer or oversized:
+        yield None if oversized else buffer
+
+def _parse_ndjson_line(line: Optional[bytes]):
+    """One NDJSON item, or the ValueError that takes its slot in the results"""
+    if line is None:
+        return ValueError(f"Line too long (max {BULK_MAX_ITEM_BYTES} bytes)")
+    try:
+        return json.loads(line.decode("utf-8"))
+    except UnicodeDecodeError as e:
+        return ValueError(f"Invalid UTF-8: {e}")
+    except ValueError as e:
+        return ValueError(f"Invalid JSON: {e}")
+
+async def _read_bulk_items(request: Request) -> List:
+    """
+    Raw items of a bulk request body (JSON array or NDJSON)
+
+    The body is read as a stream: NDJSON is parsed line by line and a JSON
+    array is capped at the bytes BULK_MAX_ITEMS tickets could take, so an
+    oversized import is refused with 413 without reading it all.
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        items = []
+        async for line in _ndjson_lines(request.stream()):
+            if line is not None and not line.strip():
+                continue
+            if len(items) == BULK_MAX_ITEMS:
+                raise _too_many_items()
+            # Invalid lines keep their slot so indexes match input lines
+            items.append(_parse_ndjson_line(line))
+        return items
+    
+    body = bytearray()
+    max_bytes = BULK_MAX_ITEMS * BULK_MAX_ITEM_BYTES
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise _too_many_items()
+    try:
+        # Also rejects a body that is not valid UTF-8
+        items = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of tickets")
+    if len(items) > BULK_MAX_ITEMS:
+        raise _too_many_items()
+    return items
+
+def _bulk_failure(index: int, error) -> Dict:
+    return {"index": index, "status": "failed", "error": str(error)}
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+        for err in exc.errors()
+    )
+
+@app.post("/api/tickets/bulk")
+async def submit_tickets_bulk(request: Request):
+    """
+    Submit many HR tickets at once
+    - Accepts a JSON array of tickets or an NDJSON stream
+      (Content-Type: application/x-ndjson)
+    - Redacts, classifies and resolves in batches
+    - Reports a result per item; invalid items and tickets that fail to
+      process don't fail the request
+    """
+    items = await _read_bulk_items(request)
+    results = [None] * len(items)
+    
+    # Validate everything up front so batches only hold good submissions
+    valid = []
+    for index, item in enumerate(items):
+        if isinstance(item, Exception):
+            results[index] = _bulk_failure(index, item)
+            continue
+        try:
+            valid.append((index, TicketSubmission.model_validate(item)))
+        except ValidationError as e:
+            results[index] = _bulk_failure(index, _validation_message(e))
+    
+    for start in range(0, len(valid), BULK_BATCH_SIZE):
+        # (index, submission, analysis, (redacted, pii_types)) per ticket;
+        # a ticket that fails at any stage fails alone
+        prepared = []
+        for index, submission in valid[start:start + BULK_BATCH_SIZE]:
+            try:
+                analysis = text_analyzer.analyze(submission.description)
+                redaction = pii_detector.redact(submission.description, analysis)
+            except Exception as e:
+                results[index] = _bulk_failure(index, e)
+                continue
+            prepared.append((index, submission, analysis, redaction))
+        
+        classifications = await ai_service.classify_batch_async(
+            [submission.description for _, submission, _, _ in prepared],
+            [analysis for _, _, analysis, _ in prepared],
+            return_exceptions=True,
+        )
+        
+        for (index, submission, analysis, (redacted, pii_types)), classification in zip(
+            prepared, classifications
+        ):
+            if isinstance(classification, Exception):
+                results[index] = _bulk_failure(index, classification)
+                continue
+            try:
+                ticket = create_ticket(
+                    submission, redacted, pii_types, classification, analysis=analysis
+                )
+            except Exception as e:
+                results[index] = _bulk_failure(index, e)
+                continue
+            results[index] = {
+                "index": index,
+                "status": "created",
+                "ticket": {
+                    "id": ticket["id"],
+                    "category": ticket["category"],
+                    "urgency": ticket["urgency"],
+                    "status": ticket["status"],
+                    "confidence": ticket["confidence"],
+                    "auto_resolved": ticket["auto_resolved"],
+                },
+            }
+        
+        # Let other requests run between batches of a large import
+        await asyncio.sleep(0)
+    
+    created = sum(1 for result in results if result["status"] == "created")
+    return {
+        "submitted": len(items),
+        "created": created,
+        "failed": len(items) - created,
+        "results": results,
+    }
+
+def _data_etag() -> str:
+    """ETag for any response derived from the ticket store"""
+    return f'W/"{ETAG_EPOCH}-{TICKETS.version}"'
+
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    """304 response if the client already holds the current version"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    if etag in tags or "*" in tags:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": "no-cache"},
+        )
+    return None
+
+def _set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    # Let browsers cache but always revalidate with If-None-Match
+    response.headers["Cache-Control"] = "no-cache"
+
+def _encode_cursor(ticket: dict) -> str:
+    """Opaque pagination cursor for the position after a ticket"""
+    raw = json.dumps(TicketStore.key_of(ticket)).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        created_at, ticket_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (str(created_at), int(ticket_id))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @app.get("/api/tickets")
 async def get_tickets(
+    request: Request,
+    response: Response,
     status: Optional[str] = None,
     category: Optional[str] = None,
     department: Optional[str] = None,
-    limit: int = 50
+    limit: int = 50,
+    cursor: Optional[str] = None,
 ):
-    """Get tickets with optional filtering"""
-    filtered_tickets = TICKETS
+    """
+    Get tickets with optional filtering, newest first
+    
+    Keyset-paginated on (created_at, id): when more tickets match, the
+    X-Next-Cursor response header holds the cursor for the next page.
+    Tickets submitted while paging never shift later pages.
+    Supports conditional GET via ETag / If-None-Match.
+    """
+    etag = _data_etag()
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    _set_etag(response, etag)
+    if limit < 1:
+        return []
+    
+    page = TICKETS.query(
+        status=status,
+        category=category,
+        department=department,
+        limit=limit + 1,
+        before=_decode_cursor(cursor) if cursor else None,
+    )
     
-    if status:
-        filtered_tickets = [t for t in filtered_tickets if t["status"] == status]
+    if len(page) > limit:
+        page = page[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(page[-1])
+    
+    return page
+
+def _iter_export_pages(
+    status: Optional[str],
+    category: Optional[str],
+    department: Optional[str],
+    redacted: bool,
+):
+    """Walk matching tickets newest-first, yielding one keyset page at a time"""
+    before = None
+    while True:
+        page = TICKETS.query(
+            status=status,
+            category=category,
+            department=department,
+            limit=EXPORT_PAGE_SIZE,
+            before=before,
+        )
+        if redacted:
+            page = [_redacted_export_row(ticket) for ticket in page]
+        if page:
+            yield page
+        
+        if len(page) < EXPORT_PAGE_SIZE:
+            return
+        before = TicketStore.key_of(page[-1])
+
+def _redacted_export_row(ticket: Dict) -> Dict:
+    ticket = dict(ticket)
+    description = ticket.pop("description")
+    if "description_redacted" not in ticket:
+        # Seeded tickets predate redaction at submit time
+        ticket["description_redacted"] = pii_detector.redact(description)[0]
+    return ticket
+
+# Each page is one chunk: StreamingResponse hops to the threadpool per
+# chunk of a sync iterator, so per-row chunks dominate the export time
+
+def _export_ndjson(pages):
+    for page in pages:
+        yield "".join(json.dumps(ticket, default=str) + "\n" for ticket in page)
+
+def _export_csv(pages, redacted: bool):
+    fields = list(EXPORT_CSV_FIELDS)
+    if redacted:
+        fields[fields.index("description")] = "description_redacted"
     
-    if category:
-        filtered_tickets = [t for t in filtered_tickets if t["category"] == category]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue()
+
+@app.get("/api/tickets/export")
+async def export_tickets(
+    format: str = "ndjson",
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    department: Optional[str] = None,
+    redacted: bool = False,
+):
+    """
+    Stream the ticket history as NDJSON or CSV, newest first
+    - Same filters as GET /api/tickets
+    - redacted=true exports description_redacted instead of description
+    - Memory use is flat regardless of history size
+    """
+    pages = _iter_export_pages(status, category, department, redacted)
     
-    if department:
-        filtered_tickets = [t for t in filtered_tickets if t["department"] == department]
+    if format == "ndjson":
+        body, media_type = _export_ndjson(pages), "application/x-ndjson"
+    elif format == "csv":
+        body, media_type = _export_csv(pages, redacted), "text/csv"
+    else:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
     
-    # Sort by created_at descending
-    sorted_tickets = sorted(
-        filtered_tickets, 
-        key=lambda x: x["created_at"], 
-        reverse=True
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="tickets.{format}"'},
     )
+
+@app.get("/api/tickets/events")
+async def ticket_events(
+    request: Request,
+    department: Optional[str] = None,
+    status: Optional[str] = None,
+):
+    """
+    Server-Sent Events feed of ticket activity
+    - Events: ticket_created, status_changed, feedback
+    - Optional department/status filters per client
+    - A "resync" event means the client fell behind and should refetch
+    """
+    subscription = event_broker.subscribe(department=department, status=status)
     
-    return sorted_tickets[:limit]
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=SSE_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield EventBroker.format_sse(event)
+        finally:
+            event_broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/api/tickets/{ticket_id}")
-async def get_ticket(ticket_id: int):
+async def get_ticket(ticket_id: int, request: Request, response: Response):
     """Get specific ticket by ID"""
-    ticket = next((t for t in TICKETS if t["id"] == ticket_id), None)
+    ticket = TICKETS.get(ticket_id)
     
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
+    etag = _data_etag()
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    _set_etag(response, etag)
     return ticket
 
+@app.get("/api/tickets/{ticket_id}/status")
+async def get_ticket_status(ticket_id: int):
+    """Triage status of a ticket, including ones still in the async queue"""
+    job = triage_queue.status(ticket_id)
+    if job:
+        return {
+            "id": ticket_id,
+            "status": "Failed" if job["state"] == "failed" else "Pending",
+            "state": job["state"],
+            "submitted_at": job["submitted_at"],
+            "error": job.get("error"),
+        }
+    
+    ticket = TICKETS.get(ticket_id)
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    
+    return {
+        "id": ticket_id,
+        "status": ticket["status"],
+        "state": "completed",
+        "category": ticket["category"],
+        "urgency": ticket["urgency"],
+        "confidence": ticket["confidence"],
+        "auto_resolved": ticket["auto_resolved"],
+        "resolution": ticket.get("resolution"),
+    }
+
 @app.post("/api/tickets/{ticket_id}/feedback")
 async def submit_feedback(ticket_id: int, feedback: FeedbackSubmission):
     """Submit feedback on AI resolution"""
-    ticket = next((t for t in TICKETS if t["id"] == ticket_id), None)
+    ticket = TICKETS.get(ticket_id)
     
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
     # Store feedback (in production, save to database)
-    ticket["feedback"] = {
-        "helpful": feedback.helpful,
-        "comment": feedback.comment,
-        "submitted_at": datetime.now().isoformat()
-    }
+    TICKETS.update(ticket_id, {
+        "feedback": {
+            "helpful": feedback.helpful,
+            "comment": feedback.comment,
+            "submitted_at": datetime.now().isoformat()
+        }
+    })
+    event_broker.publish("feedback", ticket, helpful=feedback.helpful)
     
     return {"status": "success", "message": "Feedback recorded"}
 
 @app.post("/api/tickets/{ticket_id}/override")
 async def override_decision(ticket_id: int):
     """Override AI decision and escalate to human"""
-    ticket = next((t for t in TICKETS if t["id"] == ticket_id), None)
+    ticket = TICKETS.get(ticket_id)
     
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
-    ticket["status"] = "Escalated"
-    ticket["override"] = True
-    ticket["overridden_at"] = datetime.now().isoformat()
+    previous_status = ticket["status"]
+    TICKETS.update(ticket_id, {
+        "status": "Escalated",
+        "override": True,
+        "overridden_at": datetime.now().isoformat(),
+    })
+    event_broker.publish(
+        "status_changed", ticket, previous_status=previous_status, reason="override"
+    )
     
     return {"status": "success", "message": "Ticket escalated to human agent"}
 
 @app.get("/api/analytics/metrics")
-async def get_analytics():
-    """Get analytics data for dashboard"""
-    # Category breakdown
-    category_counts = {}
-    for ticket in TICKETS:
-        cat = ticket["category"]
-        category_counts[cat] = category_counts.get(cat, 0) + 1
-    
-    # Department breakdown
-    dept_counts = {}
-    for ticket in TICKETS:
-        dept = ticket["department"]
-        dept_counts[dept] = dept_counts.get(dept, 0) + 1
-    
-    # Urgency distribution
-    urgency_counts = {"Low": 0, "Medium": 0, "High": 0, "Critical": 0}
-    for ticket in TICKETS:
-        urgency_counts[ticket["urgency"]] = urgency_counts.get(ticket["urgency"], 0) + 1
-    
-    # Daily ticket volume (last 30 days)
-    from collections import defaultdict
-    daily_tickets = defaultdict(int)
-    for ticket in TICKETS:
-        date = ticket["created_at"].split("T")[0]
-        daily_tickets[date] += 1
+async def get_analytics(request: Request, response: Response):
+    """Get analytics data for dashboard (supports If-None-Match)"""
+    etag = _data_etag()
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    _set_etag(response, etag)
     
     return {
         "summary": ANALYTICS,
-        "category_breakdown": category_counts,
-        "department_breakdown": dept_counts,
-        "urgency_distribution": urgency_counts,
-        "daily_volume": dict(daily_tickets),
+        **TICKETS.analytics(),
+    }
+
+@app.get("/api/analytics/consistency")
+async def check_analytics_consistency():
+    """Verify running analytics aggregates against a full recompute"""
+    mismatches = TICKETS.check_aggregates()
+    return {
+        "consistent": not mismatches,
+        "mismatches": mismatches,
         "total_tickets": len(TICKETS),
     }
 
 @app.get("/api/knowledge-base/search")
-async def search_knowledge_base(query: str):
-    """Search knowledge base documents"""
-    # Simple search across all KB documents
+async def search_knowledge_base(query: str, limit: int = 10):
+    """
+    Search knowledge base documents, best BM25 match first
+    
+    Each result lists its best-matching sections with a snippet and the
+    character spans of the query words in it, for highlighting.
+    """
+    words = tokenize(query)
     results = []
     
-    for filename, content in ai_service.knowledge_base.items():
-        if query.lower() in content.lower():
-            # Extract relevant snippet
-            lines = content.split('\n')
-            relevant_lines = [line for line in lines if query.lower() in line.lower()]
-            
-            results.append({
-                "file": filename,
-                "title": filename.replace('.md', '').replace('_', ' ').title(),
-                "snippets": relevant_lines[:3],  # First 3 matches
+    kb = ai_service.knowledge_base
+    for filename, score, sections in kb.search_index.search(words, limit=max(1, min(limit, 50))):
+        matches = []
+        for section, section_score in sections:
+            text, highlights = snippet(section, words)
+            matches.append({
+                "section": section.heading,
+                "path": section.path,
+                "snippet": text,
+                "highlights": highlights,
+                "score": round(section_score, 3),
             })
+        
+        results.append({
+            "file": filename,
+            "title": filename.replace('.md', '').replace('_', ' ').title(),
+            "score": round(score, 3),
+            "snippets": [match["snippet"] for match in matches],
+            "matches": matches,
+        })
     
     return results
 
+@app.get("/api/knowledge-base/suggest")
+async def suggest_knowledge_base(prefix: str, limit: int = 8):
+    """Typeahead completions (headings and common terms) for a partial query"""
+    return ai_service.knowledge_base.suggestion_index.suggest(prefix, limit=max(1, min(limit, 20)))
+
+@app.post("/api/knowledge-base/reload")
+async def reload_knowledge_base():
+    """Reindex knowledge base files changed since the last check"""
+    return await asyncio.to_thread(ai_service.reload_knowledge_base)
+
 @app.get("/api/categories")
 async def get_categories():
     """Get list of all ticket categories"""
@@ -0,0 +1,48 @@
+"""
+Shared test setup
+Runs from the backend directory so the services find their data files
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+# Keep tests offline and deterministic
+os.environ["HUGGINGFACE_TOKEN"] = ""
+os.environ.setdefault("KB_RELOAD_INTERVAL", "0")
+
+
+@pytest.fixture(scope="session")
+def ai_service():
+    from app.services.ai_service import AIService
+    service = AIService()
+    yield service
+    service.close()
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+    return TestClient(main.app)
+
+
+class FakeClock:
+    """Manually advanced stand-in for time.monotonic"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
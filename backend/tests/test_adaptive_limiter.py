@@ -0,0 +1,108 @@
+"""Adaptive concurrency limiter"""
+import asyncio
+
+from app.services.adaptive_limiter import AdaptiveLimiter
+
+
+def test_acquire_waits_for_a_released_slot():
+    async def run():
+        limiter = AdaptiveLimiter(min_limit=1, max_limit=1, initial_limit=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done() and limiter.stats()["waiting"] == 1
+        assert limiter.try_acquire() is False
+        limiter.release(limiter.now(), 0.1)
+        await asyncio.wait_for(waiter, 1)
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 1
+    assert stats["waiting"] == 0
+
+
+def test_cancelled_waiter_passes_on_its_slot():
+    async def run():
+        limiter = AdaptiveLimiter(min_limit=1, max_limit=1, initial_limit=1)
+        await limiter.acquire()
+        first = asyncio.ensure_future(limiter.acquire())
+        second = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release(limiter.now(), 0.1)
+        first.cancel()
+        await asyncio.wait_for(second, 1)
+        return first.cancelled(), limiter.stats()["in_flight"]
+
+    assert asyncio.run(run()) == (True, 1)
+
+
+def test_healthy_calls_raise_the_limit_only_when_busy(clock):
+    limiter = AdaptiveLimiter(min_limit=1, max_limit=8, initial_limit=4, clock=clock)
+    # One call in flight out of four: too little traffic to learn from
+    assert limiter.try_acquire()
+    limiter.release(limiter.now(), 0.1)
+    assert limiter.limit == 4
+
+    # Full rounds grow it by about one per round, up to the ceiling
+    for _ in range(20):
+        slots = limiter.limit
+        for _ in range(slots):
+            assert limiter.try_acquire()
+        assert limiter.try_acquire() is False
+        for _ in range(slots):
+            limiter.release(limiter.now(), 0.1)
+    assert limiter.limit == 8
+
+
+def test_slow_calls_hold_the_limit(clock):
+    limiter = AdaptiveLimiter(max_limit=8, initial_limit=2, latency_target=1.0, clock=clock)
+    for _ in range(10):
+        limiter.try_acquire()
+        limiter.try_acquire()
+        limiter.release(limiter.now(), 5.0)
+        limiter.release(limiter.now(), 5.0)
+    assert limiter.limit == 2
+
+
+def test_overload_halves_the_limit_once_per_round(clock):
+    limiter = AdaptiveLimiter(min_limit=1, max_limit=8, initial_limit=8, clock=clock)
+    clock.advance(1)
+    started = limiter.now()
+    for _ in range(4):
+        assert limiter.try_acquire()
+    clock.advance(1)
+    # A burst of 429s from calls admitted together counts as one signal
+    for _ in range(4):
+        limiter.release(started, 1.0, overloaded=True, healthy=False)
+    assert limiter.limit == 4
+    assert limiter.stats()["decreases"] == 1
+
+    # A call admitted after that decrease can shrink it again
+    clock.advance(1)
+    started = limiter.now()
+    assert limiter.try_acquire()
+    limiter.release(started, 1.0, overloaded=True, healthy=False)
+    assert limiter.limit == 2
+
+
+def test_limit_stays_within_bounds(clock):
+    limiter = AdaptiveLimiter(min_limit=2, max_limit=4, initial_limit=4, clock=clock)
+    for _ in range(5):
+        clock.advance(1)
+        started = limiter.now()
+        limiter.try_acquire()
+        limiter.release(started, 1.0, overloaded=True, healthy=False)
+    assert limiter.limit == 2
+
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert limiter.try_acquire() is False
+    assert limiter.stats()["shed"] == 1
+
+
+def test_malformed_response_leaves_the_limit_alone(clock):
+    limiter = AdaptiveLimiter(max_limit=8, initial_limit=2, clock=clock)
+    limiter.try_acquire()
+    limiter.try_acquire()
+    limiter.release(limiter.now(), 0.1, overloaded=False, healthy=False)
+    assert limiter.limit == 2
+    assert limiter.stats()["in_flight"] == 1
@@ -0,0 +1,46 @@
+"""Knowledge base auto-resolution against the seeded ticket templates"""
+import pytest
+
+
+@pytest.mark.parametrize("description, category, section", [
+    ("When is open enrollment?", "Benefits Enrollment", "Annual Enrollment Period"),
+    ("How do I request PTO for next week?", "PTO/Leave Requests", "How to Request PTO"),
+    ("What's the vacation carryover policy?", "PTO/Leave Requests", "Carryover Rules"),
+    ("Where can I find my W-2 form?", "Tax/W2 Documents", "View W-2 Tax Documents"),
+    ("How do I change my 401k contribution percentage?", "401k/Retirement", "Change 401(k) Contribution"),
+    ("What's the deductible on the PPO plan?", "Health Insurance", "PPO Plan (Preferred Provider Organization)"),
+    ("How do I update my address in Workday?", "General HR Inquiries", "Change Your Address"),
+])
+def test_resolves_from_the_matching_section(ai_service, description, category, section):
+    resolution = ai_service.auto_resolve(description, category)
+    assert resolution is not None
+    assert resolution["sources"][0]["section"] == section
+    # Auto-resolved tickets are Resolved, so their confidence clears the auto-resolve bar
+    assert 85 <= resolution["confidence"] <= 99
+
+
+def test_short_section_is_answered_with_its_siblings(ai_service):
+    resolution = ai_service.auto_resolve("What's our 401k match?", "Benefits Enrollment")
+    assert resolution is not None
+    assert "Employer Match: 50% on first 6%" in resolution["resolution"]
+
+
+@pytest.mark.parametrize("description, category", [
+    ("How do I add my spouse to health insurance?", "Benefits Enrollment"),
+    ("What's our WFH policy for new hires?", "Policy Clarifications"),
+    ("What's the dress code for client meetings?", "Policy Clarifications"),
+    ("I need to update my tax withholding", "Tax/W2 Documents"),
+    ("How do I submit a claim for reimbursement?", "Health Insurance"),
+])
+def test_escalates_without_an_on_topic_section(ai_service, description, category):
+    assert ai_service.auto_resolve(description, category) is None
+
+
+def test_resolution_confidence_stays_in_range(ai_service, monkeypatch):
+    from app.services import ai_service as module
+    monkeypatch.setattr(module, "KB_RESOLUTION_FULL_SCORE", 0.6)
+    assert ai_service._resolution_confidence(0.25, 0.25) == 85
+    assert ai_service._resolution_confidence(0.9, 0.25) == 99
+    # Bars configured at or above the full score
+    assert ai_service._resolution_confidence(0.6, 0.6) == 99
+    assert ai_service._resolution_confidence(0.8, 0.7) == 99
@@ -0,0 +1,80 @@
+"""Bulk ticket submission"""
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import main
+
+TICKET = {"employee_name": "Test User", "department": "Sales", "description": "How many PTO days do I have left?"}
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+def ndjson(*lines: bytes) -> bytes:
+    return b"\n".join(lines) + b"\n"
+
+
+def test_invalid_utf8_line_fails_alone(client):
+    body = ndjson(json.dumps(TICKET).encode(), b'{"employee_name": "\xff\xfe"}', json.dumps(TICKET).encode())
+    response = client.post("/api/tickets/bulk", content=body, headers=NDJSON)
+    assert response.status_code == 200
+    statuses = [result["status"] for result in response.json()["results"]]
+    assert statuses == ["created", "failed", "created"]
+    assert "UTF-8" in response.json()["results"][1]["error"]
+
+
+def test_invalid_utf8_array_is_rejected(client):
+    response = client.post("/api/tickets/bulk", content=b'[{"employee_name": "\xff"}]')
+    assert response.status_code == 400
+
+
+def test_item_limit(client, monkeypatch):
+    monkeypatch.setattr(main, "BULK_MAX_ITEMS", 2)
+    body = ndjson(*[json.dumps(TICKET).encode()] * 3)
+    assert client.post("/api/tickets/bulk", content=body, headers=NDJSON).status_code == 413
+    assert client.post("/api/tickets/bulk", json=[TICKET] * 3).status_code == 413
+    assert client.post("/api/tickets/bulk", json=[TICKET] * 2).status_code == 200
+
+
+def test_item_limit_stops_reading_the_stream(monkeypatch):
+    monkeypatch.setattr(main, "BULK_MAX_ITEMS", 2)
+    read = []
+
+    class StreamingRequest:
+        headers = {"content-type": "application/x-ndjson"}
+
+        async def stream(self):
+            for _ in range(10):
+                read.append(1)
+                yield json.dumps(TICKET).encode() + b"\n"
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main._read_bulk_items(StreamingRequest()))
+    assert error.value.status_code == 413
+    assert len(read) == 3
+
+
+def test_oversized_line_fails_alone(client, monkeypatch):
+    monkeypatch.setattr(main, "BULK_MAX_ITEM_BYTES", 200)
+    body = ndjson(b'{"description": "' + b"x" * 1000 + b'"}', json.dumps(TICKET).encode())
+    response = client.post("/api/tickets/bulk", content=body, headers=NDJSON)
+    statuses = [result["status"] for result in response.json()["results"]]
+    assert statuses == ["failed", "created"]
+
+
+def test_classification_error_fails_one_item(client, monkeypatch):
+    classify = main.ai_service.classify_ticket
+
+    def flaky(description, analysis=None):
+        if "broken" in description:
+            raise RuntimeError("classifier exploded")
+        return classify(description, analysis)
+
+    monkeypatch.setattr(main.ai_service, "classify_ticket", flaky)
+    broken = dict(TICKET, description="This ticket is broken on purpose")
+    response = client.post("/api/tickets/bulk", json=[TICKET, broken, TICKET])
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["created", "failed", "created"]
+    assert results[1]["error"] == "classifier exploded"
@@ -0,0 +1,52 @@
+"""LRU cache with TTL expiry"""
+from app.services.cache import LRUCache
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LRUCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("a", 1)
+    clock.advance(59)
+    assert cache.get("a") == 1
+    clock.advance(1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_reads_do_not_extend_ttl(clock):
+    cache = LRUCache(ttl=60, clock=clock)
+    cache.set("a", 1)
+    for _ in range(3):
+        clock.advance(20)
+        cache.get("a")
+    assert cache.get("a", "missing") == "missing"
+
+    # Storing again starts a fresh TTL
+    cache.set("a", 2)
+    clock.advance(59)
+    assert cache.get("a") == 2
+
+
+def test_least_recently_used_is_evicted(clock):
+    cache = LRUCache(maxsize=2, ttl=60, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_maxbytes_evicts_but_keeps_the_newest(clock):
+    cache = LRUCache(maxsize=10, ttl=60, clock=clock, maxbytes=10)
+    cache.set("a", "x" * 4)
+    cache.set("b", "x" * 4)
+    cache.set("c", "x" * 4)
+    assert cache.get("a") is None
+    assert cache.get("b") and cache.get("c")
+
+    cache.set("big", "x" * 50)
+    assert len(cache) == 1
+    assert cache.get("big")
@@ -0,0 +1,150 @@
+"""Circuit breaker, on its own and around HuggingFace calls to the stub server"""
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from app.services import ai_service as ai_module
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from benchmarks import stub_inference_server as stub
+
+
+def make_breaker(clock, **kwargs):
+    transitions = []
+    breaker = CircuitBreaker(
+        "test",
+        failure_threshold=3,
+        slow_call_seconds=2.0,
+        reset_timeout=30.0,
+        clock=clock,
+        on_state_change=lambda old, new: transitions.append((old, new)),
+        **kwargs,
+    )
+    return breaker, transitions
+
+
+def test_consecutive_failures_open_the_circuit(clock):
+    breaker, transitions = make_breaker(clock)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    # A success in between resets the count
+    assert breaker.allow()
+    breaker.record_success(0.1)
+    for _ in range(3):
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+        breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+    assert breaker.rejecting() is True
+    assert breaker.rejected == 2
+    assert breaker.trips == 1
+    assert transitions == [(CLOSED, OPEN)]
+
+
+def test_slow_successes_count_as_failures(clock):
+    breaker, _ = make_breaker(clock)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_success(5.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker, transitions = make_breaker(clock)
+    for _ in range(3):
+        breaker.allow()
+        breaker.record_failure()
+
+    clock.advance(29)
+    assert breaker.allow() is False
+    clock.advance(1)
+    assert breaker.state == HALF_OPEN
+    assert breaker.rejecting() is False
+    assert breaker.allow() is True
+    # Everyone else waits for the probe's outcome
+    assert breaker.allow() is False
+
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.allow()
+    assert transitions == [(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)]
+
+
+def test_failed_probe_reopens_for_another_timeout(clock):
+    breaker, _ = make_breaker(clock)
+    for _ in range(3):
+        breaker.allow()
+        breaker.record_failure()
+
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+
+    clock.advance(29)
+    assert breaker.allow() is False
+    clock.advance(1)
+    assert breaker.allow() is True
+
+
+@pytest.fixture
+def stub_server():
+    settings = dict(stub.SETTINGS)
+    stub.SETTINGS.update(latency=0, token_delay=0)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), stub.StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/models"
+    server.shutdown()
+    server.server_close()
+    stub.SETTINGS.clear()
+    stub.SETTINGS.update(settings)
+
+
+@pytest.fixture
+def hf_service(stub_server, clock, monkeypatch):
+    monkeypatch.setattr(ai_module, "HUGGINGFACE_TOKEN", "stub")
+    monkeypatch.setattr(ai_module, "HF_INFERENCE_URL", stub_server)
+    monkeypatch.setattr(ai_module, "CLASSIFIER_MODE", "auto")
+    service = ai_module.AIService()
+    # Send every ticket past the offline tiers
+    service.cascade_threshold = 101
+    service.circuit_breaker = CircuitBreaker(
+        "HuggingFace", failure_threshold=3, reset_timeout=30.0, clock=clock
+    )
+    yield service
+    service.close()
+
+
+def test_outage_opens_the_circuit_and_recovery_closes_it(hf_service, clock):
+    assert hf_service.use_ai
+    ticket = "Question {} about my time off request"
+
+    result = hf_service.classify_ticket(ticket.format(0))
+    assert result["classifier"] == "huggingface"
+    assert "fallback_reason" not in result
+
+    stub.SETTINGS["status"] = 503
+    for i in range(1, 4):
+        assert hf_service.classify_ticket(ticket.format(i))["fallback_reason"] == "http_error"
+    assert hf_service.circuit_breaker.state == OPEN
+
+    # While open, tickets get the offline answer without reaching the endpoint
+    calls = stub.CALLS["count"]
+    for i in range(4, 10):
+        result = hf_service.classify_ticket(ticket.format(i))
+        assert result["fallback_reason"] == "circuit_open"
+        assert result["category"] in hf_service.CATEGORIES
+    assert stub.CALLS["count"] == calls
+
+    # After the cool-down a single probe finds the endpoint healthy again
+    stub.SETTINGS["status"] = 200
+    clock.advance(30)
+    result = hf_service.classify_ticket(ticket.format(10))
+    assert "fallback_reason" not in result
+    assert stub.CALLS["count"] == calls + 1
+    assert hf_service.circuit_breaker.state == CLOSED
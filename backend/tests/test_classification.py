@@ -0,0 +1,86 @@
+"""Keyword classification and sensitive-topic screening"""
+import pytest
+
+from app.services.phrase_matcher import PhraseMatcher, fold_inflections, fold_plural, surface_forms
+
+
+@pytest.mark.parametrize("description, category", [
+    ("I need to submit my expenses and receipts", "Expense Reimbursement"),
+    ("Question about my paychecks", "Payroll Issues"),
+    ("My screen is too small, I need new monitors", "Equipment Requests"),
+    ("I forgot my passwords for workday", "IT Access Requests"),
+])
+def test_keywords_match_plurals(ai_service, description, category):
+    result = ai_service._classify_with_keywords(ai_service.analyzer.analyze(description))
+    assert result["category"] == category
+    assert result["confidence"] > 50
+
+
+def test_fold_plural():
+    assert [fold_plural(w) for w in ["receipts", "policies", "access", "bus", "ties"]] == [
+        "receipt", "policy", "access", "bus", "tie",
+    ]
+
+
+def test_folding_still_matches_whole_words():
+    matcher = PhraseMatcher(["monitor", "new hire"], fold=fold_plural)
+    assert matcher.matched("two monitors for the new hires") == {"monitor", "new hire"}
+    assert matcher.matched("monitoring the hiring") == set()
+
+
+@pytest.mark.parametrize("description", [
+    "My manager threatens me every day",
+    "I have talked to my lawyers about this",
+    "There are two lawsuits pending",
+    "A coworker keeps assaulting people",
+    "I was harassed at the offsite",
+    "They sued the company last year",
+])
+def test_inflected_sensitive_words_escalate(ai_service, description):
+    result = ai_service.classify_ticket(description)
+    assert result["sensitive"] is True
+    assert result["urgency"] == "Critical"
+
+
+@pytest.mark.parametrize("description", [
+    "I have an issue with my paycheck",
+    "My laptop issues keep coming back",
+    "When is the new badge issued?",
+])
+def test_sue_does_not_match_inside_issue(ai_service, description):
+    assert ai_service.classify_ticket(description)["sensitive"] is False
+
+
+def test_fold_inflections():
+    assert {fold_inflections(w) for w in ["sue", "sues", "sued", "suing"]} == {"su"}
+    assert {fold_inflections(w) for w in ["threaten", "threatens", "threatened", "threatening"]} == {"threaten"}
+    assert fold_inflections("issue") != fold_inflections("sue")
+
+
+def test_surface_forms_fold_back_to_the_word():
+    assert surface_forms("sue", fold_inflections) == {"sue", "sues", "sued", "suing"}
+    assert surface_forms("policy", fold_plural) == {"policy", "policies"}
+    assert surface_forms("access", fold_plural) == {"access"}
+
+
+def test_offline_result_is_most_confident_tier(ai_service):
+    analysis = ai_service.analyzer.analyze("I need a new laptop")
+    accepted, offline = ai_service._classify_cheap(analysis)
+    assert accepted is None
+    assert offline["category"] == "Equipment Requests"
+    assert offline["classifier"] == "keyword"
+    if ai_service.local_classifier:
+        assert offline["confidence"] >= ai_service._classify_with_local(analysis)["confidence"]
+
+
+@pytest.mark.parametrize("description", [
+    "Can I carry over unused days into next year",
+    "My badge does not open the office door",
+])
+def test_unmatched_keywords_do_not_beat_local_model(ai_service, description):
+    if not ai_service.local_classifier:
+        pytest.skip("local classifier not trained")
+    analysis = ai_service.analyzer.analyze(description)
+    accepted, offline = ai_service._classify_cheap(analysis)
+    assert accepted is None
+    assert offline == ai_service._classify_with_local(analysis)
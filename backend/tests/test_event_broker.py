@@ -0,0 +1,29 @@
+"""Ticket event fan-out and subscription filters"""
+import asyncio
+
+from app.services.event_broker import EventBroker
+
+TICKET = {"id": 7, "status": "Escalated", "department": "Sales", "category": "Payroll", "urgency": "High"}
+
+
+def test_status_filter_sees_tickets_leaving_the_status():
+    async def run():
+        broker = EventBroker()
+        resolved = broker.subscribe(status="Resolved")
+        escalated = broker.subscribe(status="Escalated")
+        other = broker.subscribe(status="In Progress")
+        broker.publish("status_changed", TICKET, previous_status="Resolved", reason="override")
+        return resolved.queue.qsize(), escalated.queue.qsize(), other.queue.qsize()
+
+    assert asyncio.run(run()) == (1, 1, 0)
+
+
+def test_department_filter():
+    async def run():
+        broker = EventBroker()
+        sales = broker.subscribe(department="Sales")
+        finance = broker.subscribe(department="Finance")
+        broker.publish("ticket_created", TICKET)
+        return sales.queue.qsize(), finance.queue.qsize()
+
+    assert asyncio.run(run()) == (1, 0)
@@ -0,0 +1,53 @@
+"""Incremental JSON object scanning of streamed model output"""
+import json
+
+import pytest
+
+from app.services.json_stream import JsonObjectScanner
+
+
+def feed_all(scanner, chunks):
+    for chunk in chunks:
+        found = scanner.feed(chunk)
+        if found is not None:
+            return found
+    return None
+
+
+def test_object_split_across_chunks():
+    text = '```json\n{"category": "Payroll", "nested": {"a": 1}}\n```\nTrailing prose {'
+    chunks = [text[i:i + 4] for i in range(0, len(text), 4)]
+    scanner = JsonObjectScanner()
+    found = feed_all(scanner, chunks)
+    assert json.loads(found) == {"category": "Payroll", "nested": {"a": 1}}
+
+
+def test_braces_and_escaped_quotes_inside_strings():
+    obj = {"reasoning": 'said "}" then {not json} and a \\ backslash', "confidence": 80}
+    text = json.dumps(obj)
+    scanner = JsonObjectScanner()
+    found = feed_all(scanner, list(text))
+    assert json.loads(found) == obj
+
+
+def test_incomplete_object_returns_none():
+    scanner = JsonObjectScanner()
+    assert scanner.feed("Here you go: ") is None
+    assert not scanner.started
+    assert scanner.feed('{"category": "Pay') is None
+    assert scanner.started
+    assert scanner.feed('roll"}') == '{"category": "Payroll"}'
+
+
+def test_prose_without_an_object_fails_early():
+    scanner = JsonObjectScanner(max_preamble=20)
+    assert scanner.feed("I think this ticket") is None
+    with pytest.raises(ValueError):
+        scanner.feed(" is about payroll")
+
+
+def test_object_too_long():
+    scanner = JsonObjectScanner(max_length=50)
+    scanner.feed('{"reasoning": "')
+    with pytest.raises(ValueError):
+        feed_all(scanner, ["x" * 10] * 10)
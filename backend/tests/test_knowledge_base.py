@@ -0,0 +1,52 @@
+"""Knowledge base snapshots and hot reload"""
+import pytest
+
+from app.services.ai_service import AIService
+from app.services.knowledge_base import KnowledgeBase
+
+PTO_POLICY = """# PTO Policy
+
+## How to Request Vacation Time
+
+1. Log in to Workday
+2. Submit a vacation request for approval
+"""
+
+
+@pytest.fixture
+def kb_dir(tmp_path):
+    (tmp_path / "pto_policy.md").write_text(PTO_POLICY)
+    return tmp_path
+
+
+def test_previous_snapshot_keeps_text_until_swapped(kb_dir):
+    kb = KnowledgeBase(str(kb_dir))
+    section = kb.sections[-1]
+    (kb_dir / "pto_policy.md").write_text(PTO_POLICY.replace("Workday", "the HR portal"))
+
+    refreshed = kb.refresh()
+    assert refreshed is not None and refreshed.changed == {"pto_policy.md"}
+    # Still cached for requests holding the old snapshot
+    assert "Workday" in section.text
+    assert "HR portal" in refreshed.sections[-1].text
+
+    refreshed.discard_replaced(kb)
+    # The old offsets no longer match the file on disk
+    assert section.text == ""
+
+
+def test_auto_resolve_skips_sections_edited_after_the_snapshot(kb_dir):
+    service = AIService(knowledge_base_path=str(kb_dir))
+    try:
+        query = "How do I request vacation time in Workday?"
+        assert service.auto_resolve(query, "PTO/Leave Requests") is not None
+
+        old = service.knowledge_base
+        (kb_dir / "pto_policy.md").write_text(PTO_POLICY.replace("Workday", "the HR portal"))
+        assert service.reload_knowledge_base()["changed"] == ["pto_policy.md"]
+
+        # A request that started on the old snapshot finishes on it
+        service.knowledge_base = old
+        assert service.auto_resolve(query, "PTO/Leave Requests") is None
+    finally:
+        service.close()
@@ -0,0 +1,34 @@
+"""PII detection and medical-term screening"""
+import pytest
+
+from app.services.pii_detector import PIIDetector
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return PIIDetector()
+
+
+@pytest.mark.parametrize("text", [
+    "I was treated unfairly by my manager",
+    "I need hearing aids covered",
+    "My manager diagnosed the problem with the report",
+])
+def test_everyday_words_are_not_medical(detector, text):
+    assert "MEDICAL_INFO" not in detector.detect_pii_types(text)
+
+
+@pytest.mark.parametrize("text", [
+    "I'm being treated for diabetes and need FMLA",
+    "My HIV medications are not covered",
+    "I was diagnosed with AIDS last year",
+    "I have two doctors appointments this week",
+])
+def test_medical_terms(detector, text):
+    assert "MEDICAL_INFO" in detector.detect_pii_types(text)
+
+
+def test_redaction(detector):
+    redacted, pii_types = detector.redact("My SSN is 123-45-6789, email john.doe@company.com")
+    assert redacted == "My SSN is [REDACTED-SSN-6789], email [REDACTED-EMAIL]@company.com"
+    assert sorted(pii_types) == ["EMAIL", "SSN"]
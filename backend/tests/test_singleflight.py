@@ -0,0 +1,87 @@
+"""Single-flight request coalescing"""
+import asyncio
+
+import pytest
+
+from app.services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"category": "Payroll"}
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+        other = await flight.do("other", fetch)
+        return flight, results, other
+
+    flight, results, other = asyncio.run(run())
+    assert len(calls) == 2
+    assert [shared for _, shared in results] == [False, True, True, True, True]
+    assert all(result == {"category": "Payroll"} for result, _ in results)
+    assert other == ({"category": "Payroll"}, False)
+    assert flight.stats() == {"in_flight": 0, "leaders": 2, "followers": 4}
+
+
+def test_followers_see_the_leaders_error():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        flight = SingleFlight()
+        return await asyncio.gather(
+            flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_follower_times_out_without_cancelling_the_leader():
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "done"
+
+    async def run():
+        flight = SingleFlight(timeout=0.05)
+        leader = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await flight.do("key", slow)
+        return await leader
+
+    assert asyncio.run(run()) == ("done", False)
+
+
+def test_stale_leader_no_longer_absorbs_callers(clock):
+    release = None
+
+    async def stuck():
+        await release.wait()
+        return "stale"
+
+    async def fresh():
+        return "fresh"
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        flight = SingleFlight(timeout=30.0, clock=clock)
+        leader = asyncio.ensure_future(flight.do("key", stuck))
+        await asyncio.sleep(0)
+        clock.advance(31)
+        # Past the timeout a new caller leads its own call
+        result = await flight.do("key", fresh)
+        release.set()
+        return result, await leader, flight.stats()
+
+    result, leader, stats = asyncio.run(run())
+    assert result == ("fresh", False)
+    assert leader == ("stale", False)
+    assert stats["leaders"] == 2 and stats["followers"] == 0
@@ -0,0 +1,74 @@
+"""Ticket store indexes and running aggregates"""
+import random
+import threading
+
+from app.services.ticket_store import TicketAggregates, TicketStore
+
+STATUSES = ("Open", "Auto-Resolved", "Escalated", "Closed")
+CATEGORIES = ("Payroll", "Benefits Questions", "Time Off Requests")
+DEPARTMENTS = ("Sales", "Engineering", "HR")
+URGENCIES = TicketAggregates.URGENCY_LEVELS
+
+
+def make_ticket(ticket_id: int, rng: random.Random) -> dict:
+    return {
+        "id": ticket_id,
+        "created_at": f"2026-01-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00",
+        "status": rng.choice(STATUSES),
+        "category": rng.choice(CATEGORIES),
+        "department": rng.choice(DEPARTMENTS),
+        "urgency": rng.choice(URGENCIES),
+    }
+
+
+def test_aggregates_match_recompute_after_concurrent_writes():
+    rng = random.Random(7)
+    store = TicketStore([make_ticket(i, rng) for i in range(1, 201)])
+
+    def writer(seed: int):
+        rng = random.Random(seed)
+        for _ in range(200):
+            if rng.random() < 0.3:
+                store.add(make_ticket(store.reserve_id(), rng))
+            else:
+                store.update(rng.randint(1, 200), {
+                    "status": rng.choice(STATUSES),
+                    "urgency": rng.choice(URGENCIES),
+                    "category": rng.choice(CATEGORIES),
+                })
+
+    threads = [threading.Thread(target=writer, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.check_aggregates() == []
+    assert store.analytics() == TicketAggregates.from_tickets(store).snapshot()
+    assert store.analytics()["total_tickets"] == len(store)
+
+
+def test_unchanged_fields_do_not_recount():
+    rng = random.Random(1)
+    store = TicketStore([make_ticket(1, rng)])
+    before = store.analytics()
+    store.update(1, {"status": store.get(1)["status"], "feedback": {"helpful": True}})
+    assert store.analytics() == before
+    assert store.check_aggregates() == []
+
+
+def test_check_aggregates_reports_drift():
+    rng = random.Random(2)
+    store = TicketStore([make_ticket(i, rng) for i in range(1, 11)])
+    # Bypass update(): the running counts no longer match the tickets
+    store.get(1)["status"] = "Reopened"
+    assert store.check_aggregates() == ["status_breakdown"]
+
+
+def test_metrics_endpoint_agrees_with_consistency_check(client):
+    metrics = client.get("/api/analytics/metrics").json()
+    consistency = client.get("/api/analytics/consistency").json()
+    assert consistency["consistent"] is True
+    assert consistency["mismatches"] == []
+    assert metrics["total_tickets"] == consistency["total_tickets"]
+    assert sum(metrics["status_breakdown"].values()) == metrics["total_tickets"]
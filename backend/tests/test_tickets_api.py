@@ -0,0 +1,106 @@
+"""Ticket listing, export and conditional GET endpoints"""
+
+
+def test_list_tickets_pages_with_cursor(client):
+    response = client.get("/api/tickets", params={"limit": 2})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert response.headers.get("X-Next-Cursor")
+
+
+def test_list_tickets_non_positive_limit_is_empty(client):
+    for limit in (0, -5):
+        response = client.get("/api/tickets", params={"limit": limit})
+        assert response.status_code == 200
+        assert response.json() == []
+
+
+def test_async_triage_stores_submitted_at(monkeypatch):
+    import asyncio
+    import main
+
+    submitted_at = "2026-01-05T09:30:00"
+    monkeypatch.setattr(main.triage_queue, "status", lambda job_id: {"submitted_at": submitted_at})
+    ticket_id = main.TICKETS.reserve_id()
+    submission = main.TicketSubmission(
+        employee_name="Test User", department="Sales", description="How many PTO days do I have left?"
+    )
+    asyncio.run(main.run_triage(ticket_id, submission))
+    assert main.TICKETS.get(ticket_id)["submitted_at"] == submitted_at
+
+
+def test_export_pages_cover_every_ticket(client, monkeypatch):
+    import main
+
+    # Several pages, the last one partial
+    monkeypatch.setattr(main, "EXPORT_PAGE_SIZE", 3)
+    expected = len(main.TICKETS)
+    ndjson = client.get("/api/tickets/export", params={"format": "ndjson"}).text.splitlines()
+    csv_rows = client.get("/api/tickets/export", params={"format": "csv", "redacted": True}).text.splitlines()
+    assert len(ndjson) == expected
+    assert len(set(ndjson)) == expected
+    assert len(csv_rows) == expected + 1
+    assert "description_redacted" in csv_rows[0]
+
+
+def test_cursor_pages_skip_nothing_while_tickets_arrive(client, monkeypatch):
+    import main
+    from app.services.ticket_store import TicketStore
+
+    def ticket(ticket_id, created_at):
+        return {
+            "id": ticket_id, "created_at": created_at, "status": "Open",
+            "category": "Payroll", "department": "Sales", "urgency": "Low",
+        }
+
+    # Several tickets share a timestamp, so the id tiebreak matters
+    original = [ticket(i, f"2026-01-01T10:{i // 3:02d}:00") for i in range(1, 31)]
+    store = TicketStore(list(original))
+    monkeypatch.setattr(main, "TICKETS", store)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 4, "department": "Sales"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/tickets", params=params)
+        seen.extend(t["id"] for t in response.json())
+        # New submissions land ahead of the cursor, and one with a
+        # timestamp tied to tickets already paged past
+        new_id = store.reserve_id()
+        store.add(ticket(new_id, f"2026-01-02T{new_id % 24:02d}:00:00"))
+        store.add(ticket(store.reserve_id(), f"2026-01-01T10:{seen[-1] // 3:02d}:00"))
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    originals_seen = [i for i in seen if i <= 30]
+    assert sorted(originals_seen) == list(range(1, 31))
+    assert len(set(seen)) == len(seen)
+
+
+def test_etag_revalidation_until_tickets_change(client, monkeypatch):
+    import main
+    from app.services.ticket_store import TicketStore
+
+    store = TicketStore([{
+        "id": 1, "created_at": "2026-01-01T10:00:00", "status": "Open",
+        "category": "Payroll", "department": "Sales", "urgency": "Low",
+    }])
+    monkeypatch.setattr(main, "TICKETS", store)
+
+    for path in ("/api/tickets", "/api/tickets/1", "/api/analytics/metrics"):
+        first = client.get(path)
+        etag = first.headers["ETag"]
+        assert first.status_code == 200
+        assert first.headers["Cache-Control"] == "no-cache"
+
+        cached = client.get(path, headers={"If-None-Match": f'W/"other", {etag}'})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["ETag"] == etag
+
+        store.update(1, {"status": "Escalated"})
+        changed = client.get(path, headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
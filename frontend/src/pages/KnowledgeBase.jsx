@@ -3,6 +3,21 @@ import { Search, BookOpen, ExternalLink } from 'lucide-react';
 import Card from '../components/Card';
 import { knowledgeBaseService } from '../services/api';
 
+/**
+ * Snippet text with the matched query words marked
+ */
+const HighlightedText = ({ text, highlights }) => {
+    const parts = [];
+    let last = 0;
+    highlights.forEach(([start, end], idx) => {
+        parts.push(text.slice(last, start));
+        parts.push(<mark key={idx} className="bg-yellow-100 text-gray-900 rounded px-0.5">{text.slice(start, end)}</mark>);
+        last = end;
+    });
+    parts.push(text.slice(last));
+    return <>{parts}</>;
+};
+
 /**
  * Knowledge Base - Search and browse HR policies
  */
@@ -10,6 +25,7 @@ const KnowledgeBase = () => {
     const [searchQuery, setSearchQuery] = useState('');
     const [searchResults, setSearchResults] = useState([]);
     const [searching, setSearching] = useState(false);
+    const [suggestions, setSuggestions] = useState([]);
 
     const documents = [
         {
@@ -47,6 +63,10 @@ const KnowledgeBase = () => {
     const handleSearch = async (query) => {
         setSearchQuery(query);
 
+        knowledgeBaseService.suggest(query)
+            .then(setSuggestions)
+            .catch(() => setSuggestions([]));
+
         if (query.length < 3) {
             setSearchResults([]);
             return;
@@ -81,8 +101,14 @@ const KnowledgeBase = () => {
                         placeholder="Search knowledge base... (e.g., 'vacation days', '401k match', 'remote work')"
                         value={searchQuery}
                         onChange={(e) => handleSearch(e.target.value)}
+                        list="kb-suggestions"
                         className="w-full pl-10 pr-4 py-3 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-primary-500 text-lg"
                     />
+                    <datalist id="kb-suggestions">
+                        {suggestions.map((suggestion) => (
+                            <option key={suggestion.text} value={suggestion.text} />
+                        ))}
+                    </datalist>
                 </div>
 
                 {/* Search Results */}
@@ -99,8 +125,13 @@ const KnowledgeBase = () => {
                                     {searchResults.map((result, idx) => (
                                         <div key={idx} className="p-3 bg-gray-50 rounded-lg">
                                             <p className="font-medium text-gray-900 mb-1">{result.title}</p>
-                                            {result.snippets.map((snippet, sidx) => (
-                                                <p key={sidx} className="text-sm text-gray-700">• {snippet}</p>
+                                            {result.matches.map((match, sidx) => (
+                                                <div key={sidx} className="mt-2">
+                                                    <p className="text-xs font-medium text-primary-700">{match.section}</p>
+                                                    <p className="text-sm text-gray-700">
+                                                        • <HighlightedText text={match.snippet} highlights={match.highlights} />
+                                                    </p>
+                                                </div>
                                             ))}
                                         </div>
                                     ))}
@@ -21,6 +21,14 @@ const TicketQueue = () => {
         fetchTickets();
     }, [filters]);
 
+    // Refetch when a ticket matching the current filters changes
+    useEffect(() => {
+        return ticketService.subscribeToEvents(
+            { status: filters.status, department: filters.department },
+            () => fetchTickets()
+        );
+    }, [filters]);
+
     const fetchTickets = async () => {
         setLoading(true);
         try {
@@ -23,6 +23,16 @@ export const ticketService = {
         return response.data;
     },
 
+    // Get one page of tickets; pass nextCursor back in to fetch the next page
+    getTicketsPage: async (filters = {}, cursor = null) => {
+        const params = cursor ? { ...filters, cursor } : filters;
+        const response = await api.get('/api/tickets', { params });
+        return {
+            tickets: response.data,
+            nextCursor: response.headers['x-next-cursor'] || null,
+        };
+    },
+
     // Get single ticket
     getTicket: async (ticketId) => {
         const response = await api.get(`/api/tickets/${ticketId}`);
@@ -35,6 +45,18 @@ export const ticketService = {
         return response.data;
     },
 
+    // Subscribe to live ticket events (Server-Sent Events); returns an unsubscribe function
+    subscribeToEvents: (filters = {}, onEvent) => {
+        const params = new URLSearchParams(
+            Object.entries(filters).filter(([, value]) => value)
+        );
+        const source = new EventSource(`${API_BASE_URL}/api/tickets/events?${params}`);
+        ['ticket_created', 'status_changed', 'feedback', 'resync'].forEach((type) =>
+            source.addEventListener(type, (event) => onEvent(JSON.parse(event.data)))
+        );
+        return () => source.close();
+    },
+
     // Override AI decision
     overrideDecision: async (ticketId) => {
         const response = await api.post(`/api/tickets/${ticketId}/override`);
@@ -56,6 +78,12 @@ export const knowledgeBaseService = {
         const response = await api.get('/api/knowledge-base/search', { params: { query } });
         return response.data;
     },
+
+    // Typeahead completions for a partial query
+    suggest: async (prefix) => {
+        const response = await api.get('/api/knowledge-base/suggest', { params: { prefix } });
+        return response.data;
+    },
 };
 
 export const systemService = {
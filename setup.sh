@@ -32,6 +32,9 @@ pip install -q -r requirements.txt
 echo "Generating mock data..."
 python3 app/services/mock_data.py
 
+echo "Training local classifier..."
+python3 -m app.services.local_classifier
+
 echo -e "${GREEN}✓ Backend setup complete${NC}"
 echo ""
 